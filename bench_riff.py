@@ -0,0 +1,194 @@
+import argparse
+import io
+import json
+import riff
+import sys
+import timeit
+import tracemalloc
+
+
+def tinychunks(count):
+    output = io.BytesIO()
+    with riff.RiffWriter(output, 'MOCK', reserve=False) as writer:
+        for index in range(count):
+            writer.subchunk('TINY').write(b'ab')
+    return output.getvalue()
+
+
+def hugedata(size):
+    output = io.BytesIO()
+    with riff.RiffWriter(output, 'WAVE', reserve=False) as writer:
+        writer.subchunk('fmt ').write(
+            riff.WaveFormatChunk.FORMAT_STRUCT.pack(1, 2, 48000, 192000, 4, 16)
+        )
+        writer.subchunk('data').write(bytes(size))
+    return output.getvalue()
+
+
+def deepnesting(depth):
+    output = io.BytesIO()
+    with riff.RiffWriter(output, 'MOCK', reserve=False) as writer:
+        sublists = [writer]
+        for level in range(depth):
+            sublists.append(sublists[-1].sublist('L{:03d}'.format(level)))
+        sublists[-1].subchunk('LEAF').write(b'leaf')
+        for sublist in reversed(sublists[1:]):
+            sublist.close()
+    return output.getvalue()
+
+
+def oddchunks(count):
+    output = io.BytesIO()
+    with riff.RiffWriter(output, 'MOCK', reserve=False) as writer:
+        for index in range(count):
+            writer.subchunk('ODDC').write(b'x' * (2 * (index % 64) + 1))
+    return output.getvalue()
+
+
+def readheaders(buffer):
+    iostream = io.BytesIO(buffer)
+    iostream.seek(12)
+    while iostream.tell() < len(buffer):
+        header = riff.ChunkHeader.readfrom(iostream)
+        iostream.seek(header.size + header.size % 2, io.SEEK_CUR)
+
+
+def iterheaders(buffer):
+    iostream = io.BytesIO(buffer)
+    iostream.seek(12)
+    for position, id, size in riff.ChunkHeader.iterfrom(iostream):
+        pass
+
+
+def readchunk(buffer):
+    riff.Chunk.readfrom(io.BytesIO(buffer))
+
+
+def streamchunk(buffer):
+    riff.Chunk.streamfrom(io.BytesIO(buffer))
+
+
+def enumerate_subchunks(buffer):
+    riffchunk = riff.RiffChunk.streamfrom(io.BytesIO(buffer))
+    for subchunk in riffchunk.subchunks():
+        pass
+
+
+def findleaf(buffer, path):
+    riff.RiffChunk.readfrom(io.BytesIO(buffer)).find(path)
+
+
+def readdata(buffer, blocksize):
+    riffchunk = riff.RiffChunk.streamfrom(io.BytesIO(buffer))
+    data = riffchunk.find('data').data
+    while data.read(blocksize):
+        pass
+
+
+def readdatainto(buffer, blocksize):
+    riffchunk = riff.RiffChunk.streamfrom(io.BytesIO(buffer))
+    data = riffchunk.find('data').data
+    block = bytearray(blocksize)
+    while data.readinto(block):
+        pass
+
+
+def wavestats(buffer, workers):
+    wavechunk = riff.WaveChunk.readfrom(io.BytesIO(buffer))
+    wavechunk.stats(binsizes=[256, 4096], workers=workers)
+
+
+def benchmarks(scale):
+    tiny = tinychunks(10000 * scale)
+    huge = hugedata(16 * 1024 * 1024 * scale)
+    deep = deepnesting(100)
+    odd = oddchunks(5000 * scale)
+    leafpath = '/'.join(
+        ['LIST/L{:03d}'.format(level) for level in range(100)] + ['LEAF']
+    )
+    results = [
+        ('ChunkHeader.readfrom tiny', len(tiny), lambda: readheaders(tiny)),
+        ('ChunkHeader.iterfrom tiny', len(tiny), lambda: iterheaders(tiny)),
+        ('Chunk.readfrom huge', len(huge), lambda: readchunk(huge)),
+        ('Chunk.streamfrom huge', len(huge), lambda: streamchunk(huge)),
+        ('RiffChunk.subchunks tiny', len(tiny),
+         lambda: enumerate_subchunks(tiny)),
+        ('RiffChunk.subchunks odd', len(odd),
+         lambda: enumerate_subchunks(odd)),
+        ('RiffChunk.find deep', len(deep), lambda: findleaf(deep, leafpath)),
+        ('ChunkData.read 64K huge', len(huge),
+         lambda: readdata(huge, 64 * 1024)),
+        ('ChunkData.readinto 64K huge', len(huge),
+         lambda: readdatainto(huge, 64 * 1024)),
+    ]
+    if riff.numpy is not None:
+        results += [
+            ('WaveChunk.stats huge', len(huge), lambda: wavestats(huge, 1)),
+            ('WaveChunk.stats 4 workers huge', len(huge),
+             lambda: wavestats(huge, 4)),
+        ]
+    return results
+
+
+def measure(function, repeat, number):
+    times = timeit.repeat(function, repeat=repeat, number=number)
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times) / number, peak
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for key in ('seconds', 'peakbytes'):
+            if previous[key] and result[key] > previous[key] * threshold:
+                regressions.append('{}: {} {:.6g} > {:.6g} * {}'.format(
+                    name, key, result[key], previous[key], threshold
+                ))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark riff parsing, streaming and decoding.'
+    )
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=1)
+    parser.add_argument('--filter', default='')
+    parser.add_argument('--output', help='write results as json')
+    parser.add_argument('--baseline', help='compare with results json')
+    parser.add_argument('--threshold', type=float, default=1.25)
+    args = parser.parse_args(argv)
+    results = {}
+    for name, size, function in benchmarks(args.scale):
+        if args.filter not in name:
+            continue
+        seconds, peakbytes = measure(function, args.repeat, args.number)
+        results[name] = {
+            'seconds': seconds, 'peakbytes': peakbytes, 'bytes': size
+        }
+        print('{:<32}{:>12.3f} ms{:>12.1f} MB/s{:>12.1f} KiB peak'.format(
+            name, seconds * 1000, size / seconds / 1e6, peakbytes / 1024
+        ))
+    if args.output:
+        with open(args.output, 'w') as iostream:
+            json.dump(results, iostream, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as iostream:
+            regressions = compare(results, json.load(iostream), args.threshold)
+        for regression in regressions:
+            print('regression: ' + regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,24 +1,221 @@
+import array
+import collections
+import concurrent.futures
+import hashlib
 import io
+import mmap
+import os
+import re
 import struct
+import sys
+import threading
+import time
+import weakref
+import zlib
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+_hooks = []
+_pread = getattr(os, 'pread', None)
+_preadv = getattr(os, 'preadv', None)
+_streamstates = weakref.WeakKeyDictionary()
+_streamstateslock = threading.Lock()
 
 
 class Error(Exception):
     pass
 
 
+def _emit(event, value):
+    for hook in _hooks:
+        hook(event, value)
+
+
+def _emitio(iostream, event, value):
+    if not isinstance(iostream, ChunkData):
+        _emit(event, value)
+
+
+async def _areadfully(reader, size):
+    buffer = bytearray()
+    while len(buffer) < size:
+        more = await reader.read(size - len(buffer))
+        if not more:
+            break
+        buffer += more
+    return bytes(buffer)
+
+
+def _requirenumpy():
+    if numpy is None:
+        raise ImportError('numpy is required for sample conversion')
+
+
+def _filefd(iostream, writable=False):
+    buffered = (io.BufferedReader, io.BufferedWriter, io.BufferedRandom)
+    if isinstance(iostream, buffered):
+        iostream = iostream.raw
+    if not isinstance(iostream, io.FileIO) or iostream.closed:
+        return -1
+    return iostream.fileno() if iostream.writable() == writable else -1
+
+
+def _statefor(iostream):
+    with _streamstateslock:
+        try:
+            state = _streamstates.get(iostream)
+            if state is None:
+                state = _streamstates[iostream] = _StreamState()
+        except TypeError:
+            state = _StreamState()
+    return state
+
+
+def _newhash(algorithm):
+    if algorithm == _Crc32Hash.name:
+        return _Crc32Hash()
+    return hashlib.new(algorithm)
+
+
+def _mapfile(path):
+    with open(path, 'rb') as iostream:
+        if os.fstat(iostream.fileno()).st_size == 0:
+            return memoryview(b'')
+        mapping = mmap.mmap(iostream.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapping)
+
+
+class _Crc32Hash:
+    __slots__ = ('_value',)
+    name = 'crc32'
+
+    def __init__(self):
+        self._value = 0
+
+    def digest(self):
+        return struct.pack('>I', self._value)
+
+    def hexdigest(self):
+        return '{:08x}'.format(self._value)
+
+    def update(self, buffer):
+        self._value = zlib.crc32(buffer, self._value)
+
+
+class _StreamState:
+    __slots__ = ('lock',)
+
+    def __init__(self):
+        self.lock = threading.RLock()
+
+
 class ChunkHeader:
+    __slots__ = ('_id', '_size')
     HEADER_STRUCT = struct.Struct('<4sI')
+    MAX_SIZE = 0xffffffff
+    RF64_IDS = ('RF64', 'BW64')
+    SCAN_BLOCK_SIZE = 64 * 1024
 
     def __init__(self, id, size):
         self._id = id
         self._size = size
 
+    @classmethod
+    async def areadfrom(cls, reader):
+        buffer = await _areadfully(reader, cls.HEADER_STRUCT.size)
+        return cls.unpackfrom(buffer)
+
+    @classmethod
+    def iterfrom(cls, iostream, end=None, blocksize=SCAN_BLOCK_SIZE):
+        seekable = iostream.seekable()
+        position = iostream.seek(0, io.SEEK_CUR) if seekable else 0
+        streampos = bufferpos = dataend = position
+        buffer = b''
+        ids = {}
+        unpack_from = cls.HEADER_STRUCT.unpack_from
+        while end is None or end - position >= cls.HEADER_STRUCT.size:
+            offset = position - bufferpos
+            if len(buffer) - offset < cls.HEADER_STRUCT.size:
+                buffer = buffer[offset:]
+                readpos = position + len(buffer)
+                if seekable and readpos != streampos:
+                    iostream.seek(readpos, io.SEEK_SET)
+                    streampos = readpos
+                while streampos < readpos:
+                    skipped = iostream.read(
+                        min(readpos - streampos, ChunkData.SKIP_BLOCK_SIZE)
+                    )
+                    if not skipped:
+                        if dataend > streampos:
+                            raise Error('chunk data truncated')
+                        return
+                    streampos += len(skipped)
+                readsize = blocksize
+                if end is not None:
+                    readsize = min(readsize, end - readpos)
+                more = iostream.read(max(readsize, cls.HEADER_STRUCT.size))
+                if _hooks:
+                    _emitio(iostream, 'read', len(more))
+                streampos += len(more)
+                buffer += more
+                bufferpos, offset = position, 0
+                if not buffer:
+                    if seekable:
+                        streampos = iostream.seek(0, io.SEEK_END)
+                    if dataend > streampos:
+                        raise Error('chunk data truncated')
+                    if end is None:
+                        return
+            if len(buffer) - offset < cls.HEADER_STRUCT.size:
+                raise Error('chunk header truncated')
+            stop = len(buffer) - cls.HEADER_STRUCT.size
+            if end is not None:
+                stop = min(stop, end - cls.HEADER_STRUCT.size - bufferpos)
+            while offset <= stop:
+                idbytes, size = unpack_from(buffer, offset)
+                id = ids.get(idbytes)
+                if id is None:
+                    id = ids[idbytes] = cls.unpackfrom(buffer, offset).id
+                yield position, id, size
+                dataend = position + cls.HEADER_STRUCT.size + size
+                if end is not None and dataend > end:
+                    raise Error('chunk data truncated')
+                step = cls.HEADER_STRUCT.size + size + size % 2
+                position += step
+                offset += step
+        if dataend > streampos:
+            if seekable:
+                streampos = iostream.seek(0, io.SEEK_END)
+            while not seekable and streampos < dataend:
+                skipped = iostream.read(
+                    min(dataend - streampos, ChunkData.SKIP_BLOCK_SIZE)
+                )
+                if not skipped:
+                    break
+                streampos += len(skipped)
+            if dataend > streampos:
+                raise Error('chunk data truncated')
+
     @classmethod
     def readfrom(cls, iostream):
+        if not _hooks:
+            return cls.unpackfrom(iostream.read(cls.HEADER_STRUCT.size))
+        start = time.perf_counter()
         buffer = iostream.read(cls.HEADER_STRUCT.size)
-        if len(buffer) < cls.HEADER_STRUCT.size:
+        _emitio(iostream, 'read', len(buffer))
+        header = cls.unpackfrom(buffer)
+        _emit('headertime', time.perf_counter() - start)
+        return header
+
+    @classmethod
+    def unpackfrom(cls, buffer, offset=0):
+        if len(buffer) - offset < cls.HEADER_STRUCT.size:
             raise Error('chunk header truncated')
-        idbytes, size = cls.HEADER_STRUCT.unpack(buffer)
+        idbytes, size = cls.HEADER_STRUCT.unpack_from(buffer, offset)
         try:
             id = idbytes.decode('ascii')
         except UnicodeDecodeError as error:
@@ -39,32 +236,397 @@ class ChunkHeader:
         iostream.write(buffer)
 
 
-class ChunkData:
-    def __init__(self, iostream, size, startpos):
+class ChunkData(io.RawIOBase):
+    COPY_BLOCK_SIZE = 1024 * 1024
+    SKIP_BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, iostream, size, startpos, view=None, buffersize=0):
+        super().__init__()
         self._iostream = iostream
         self._size = size
         self._startpos = startpos
+        self._view = view
         self._position = 0
+        self._streampos = 0
+        self._buffersize = buffersize
+        self._readahead = b''
+        self._readaheadpos = 0
+        self._fd = None
+        self._state = None
+        self._hashes = None
+        self._hashlock = None
+        self._hashpos = 0
 
     @classmethod
-    def streamfrom(cls, iostream, size):
-        startpos = iostream.seek(0, io.SEEK_CUR)
-        iostream.seek(size, io.SEEK_CUR)
-        return cls(iostream, size, startpos)
+    def frombuffer(cls, buffer, size, offset=0):
+        view = memoryview(buffer)[offset:offset + size]
+        return cls(None, size, offset, view)
+
+    @classmethod
+    def streamfrom(cls, iostream, size, buffersize=0):
+        if iostream.seekable():
+            startpos = iostream.seek(0, io.SEEK_CUR)
+            iostream.seek(size, io.SEEK_CUR)
+            if _hooks:
+                _emitio(iostream, 'seek', 1)
+        elif isinstance(iostream, ChunkData):
+            startpos = iostream.tell()
+        else:
+            startpos = None
+        return cls(iostream, size, startpos, buffersize=buffersize)
 
     def __repr__(self):
         return 'riff.ChunkData(size={0})'.format(self.size)
 
+    def _copyfileto(self, iostream):
+        copy_file_range = getattr(os, 'copy_file_range', None)
+        infd = self._preadfd()
+        outfd = _filefd(iostream, writable=True)
+        if copy_file_range is None or infd is None or outfd < 0:
+            return
+        try:
+            offset = self._fileoffset(self.tell())
+            iostream.flush()
+            outpos = iostream.tell()
+        except OSError:
+            return
+        count = 0
+        while self.tell() + count < self.size:
+            try:
+                copied = copy_file_range(
+                    infd, outfd, self.size - self.tell() - count,
+                    offset + count, outpos + count
+                )
+            except OSError:
+                break
+            if copied == 0:
+                break
+            count += copied
+        iostream.seek(outpos + count, io.SEEK_SET)
+        self.seek(count, io.SEEK_CUR)
+
+    def _fileoffset(self, position):
+        if self._view is not None or self._startpos is None:
+            raise io.UnsupportedOperation('chunk data has no file offset')
+        if isinstance(self._iostream, ChunkData):
+            return self._iostream._fileoffset(self._startpos + position)
+        return self._startpos + position
+
+    def _finishhash(self):
+        self._hashto(self.size)
+
+    def _findfd(self):
+        if _pread is None or self._view is not None or self._startpos is None:
+            return -1
+        if isinstance(self._iostream, ChunkData):
+            fd = self._iostream._preadfd()
+            return -1 if fd is None else fd
+        return _filefd(self._iostream)
+
+    def _hash(self, position, buffer):
+        if self._hashes is None:
+            return
+        with self._hashlock:
+            start = self._hashpos - position
+            if not 0 <= start < len(buffer):
+                return
+            view = memoryview(buffer)[start:]
+            for hash in self._hashes.values():
+                hash.update(view)
+            self._hashpos += len(view)
+
+    def _hashforward(self, position):
+        if not self.seekable():
+            self._hashto(position)
+
+    def _hashto(self, position):
+        while self._hashes is not None and self._hashpos < position:
+            size = min(self.SKIP_BLOCK_SIZE, position - self._hashpos)
+            if self._view is not None:
+                buffer = self._view[self._hashpos:self._hashpos + size]
+            else:
+                buffer = self._readbuffered(self._hashpos, size)
+            if not buffer:
+                raise Error('truncated at position {}'.format(self._hashpos))
+            self._hash(self._hashpos, buffer)
+
+    def _pread(self, fd, position, size):
+        offset = self._fileoffset(position)
+        buffer = _pread(fd, size, offset)
+        if _hooks:
+            _emit('read', len(buffer))
+        while 0 < len(buffer) < size:
+            more = _pread(fd, size - len(buffer), offset + len(buffer))
+            if _hooks:
+                _emit('read', len(more))
+            if not more:
+                break
+            buffer += more
+        return buffer
+
+    def _preadinto(self, fd, position, view):
+        if _preadv is None:
+            buffer = self._pread(fd, position, len(view))
+            view[:len(buffer)] = buffer
+            return len(buffer)
+        offset = self._fileoffset(position)
+        count = 0
+        while count < len(view):
+            more = _preadv(fd, [view[count:]], offset + count)
+            if _hooks:
+                _emit('read', more)
+            if not more:
+                break
+            count += more
+        return count
+
+    def _preadfd(self):
+        if self._fd is None:
+            self._fd = self._findfd()
+        return None if self._fd < 0 else self._fd
+
+    def _readat(self, position, size):
+        if self._view is not None:
+            buffer = self._view[position:position + size].tobytes()
+        elif self._preadfd() is not None:
+            buffer = self._pread(self._preadfd(), position, size)
+        else:
+            with self._streamstate().lock:
+                self._hashforward(position)
+                buffer = self._readstream(position, size)
+        self._hash(position, buffer)
+        return buffer
+
+    def _readatinto(self, position, view):
+        if self._view is not None:
+            count = len(self._view[position:position + len(view)])
+            view[:count] = self._view[position:position + count]
+        elif self._preadfd() is not None:
+            count = self._preadinto(self._preadfd(), position, view)
+        else:
+            with self._streamstate().lock:
+                self._hashforward(position)
+                count = self._readstreaminto(position, view)
+        self._hash(position, view[:count])
+        return count
+
+    def _readbuffered(self, position, size):
+        offset = position - self._readaheadpos
+        if 0 <= offset and offset + size <= len(self._readahead):
+            return self._readahead[offset:offset + size]
+        if size >= self._buffersize:
+            return self._readstream(position, size)
+        buffersize = min(self._buffersize, self.size - position)
+        self._readahead = self._readstream(position, buffersize)
+        self._readaheadpos = position
+        return self._readahead[:size]
+
+    def _readbufferedinto(self, position, view):
+        offset = position - self._readaheadpos
+        if 0 <= offset and offset + len(view) <= len(self._readahead):
+            view[:] = self._readahead[offset:offset + len(view)]
+            return len(view)
+        if len(view) >= self._buffersize:
+            return self._readstreaminto(position, view)
+        buffer = self._readbuffered(position, len(view))
+        view[:len(buffer)] = buffer
+        return len(buffer)
+
+    def _readstream(self, position, size):
+        fd = self._preadfd()
+        if fd is not None:
+            return self._pread(fd, position, size)
+        with self._streamstate().lock:
+            self._seekstream(position)
+            buffer = self._iostream.read(size)
+            if _hooks:
+                _emitio(self._iostream, 'read', len(buffer))
+            while 0 < len(buffer) < size:
+                more = self._iostream.read(size - len(buffer))
+                if _hooks:
+                    _emitio(self._iostream, 'read', len(more))
+                if not more:
+                    break
+                buffer += more
+            self._streampos = position + len(buffer)
+        return buffer
+
+    def _readstreaminto(self, position, view):
+        fd = self._preadfd()
+        if fd is not None:
+            return self._preadinto(fd, position, view)
+        with self._streamstate().lock:
+            self._seekstream(position)
+            readinto = getattr(self._iostream, 'readinto', None)
+            count = 0
+            while count < len(view):
+                if readinto is None:
+                    buffer = self._iostream.read(len(view) - count)
+                    view[count:count + len(buffer)] = buffer
+                    more = len(buffer)
+                else:
+                    more = readinto(view[count:]) or 0
+                if _hooks:
+                    _emitio(self._iostream, 'read', more)
+                if not more:
+                    break
+                count += more
+            self._streampos = position + count
+        return count
+
+    def _seekstream(self, position):
+        if self._startpos is None:
+            self._skipstream(position - self._streampos)
+            return
+        streampos = self._startpos + position
+        if self._iostream.tell() == streampos:
+            return
+        self._iostream.seek(streampos, io.SEEK_SET)
+        if _hooks:
+            _emitio(self._iostream, 'seek', 1)
+
+    def _streamstate(self):
+        if self._state is None:
+            if isinstance(self._iostream, ChunkData):
+                self._state = self._iostream._streamstate()
+            else:
+                self._state = _statefor(self._iostream)
+        return self._state
+
+    def _skipstream(self, size):
+        if size < 0:
+            raise io.UnsupportedOperation('chunk data is not seekable')
+        while size > 0:
+            buffer = self._iostream.read(min(size, self.SKIP_BLOCK_SIZE))
+            if _hooks:
+                _emitio(self._iostream, 'read', len(buffer))
+            if not buffer:
+                break
+            size -= len(buffer)
+            self._streampos += len(buffer)
+
+    def addhash(self, algorithm):
+        if self._hashes is None:
+            self._hashes = collections.OrderedDict()
+            self._hashlock = threading.Lock()
+        if algorithm in self._hashes:
+            return
+        if self._hashpos > 0:
+            raise Error('hashing already started')
+        self._hashes[algorithm] = _newhash(algorithm)
+
+    @property
+    def buffersize(self):
+        return self._buffersize
+
+    def copyto(self, iostream):
+        startpos = self.tell()
+        if self._view is not None:
+            view = self._view[startpos:self.size]
+            self._hashto(startpos)
+            self._hash(startpos, view)
+            iostream.write(view)
+            self.seek(len(view), io.SEEK_CUR)
+            if _hooks:
+                _emit('copy', len(view))
+            if self.tell() < self.size:
+                raise Error('truncated at position {}'.format(self.tell()))
+            return self.tell() - startpos
+        if self._hashes is None:
+            self._copyfileto(iostream)
+        if self.tell() < self.size:
+            buffer = memoryview(
+                bytearray(min(self.COPY_BLOCK_SIZE, self.size - self.tell()))
+            )
+            while self.tell() < self.size:
+                count = self.readinto(buffer)
+                iostream.write(buffer[:count])
+        if _hooks:
+            _emit('copy', self.tell() - startpos)
+        return self.tell() - startpos
+
+    def digests(self):
+        if self._hashes is None:
+            return collections.OrderedDict()
+        self._finishhash()
+        return collections.OrderedDict(
+            (algorithm, hash.hexdigest())
+            for algorithm, hash in self._hashes.items()
+        )
+
+    def fileno(self):
+        if self._view is not None:
+            raise io.UnsupportedOperation('chunk data is mapped')
+        return self._iostream.fileno()
+
+    def getbuffer(self):
+        if self._view is None:
+            raise io.UnsupportedOperation('chunk data is not mapped')
+        return self._view
+
     def read(self, size=None):
-        self._iostream.seek(self._startpos + self.tell(), io.SEEK_SET)
+        start = time.perf_counter() if _hooks else None
         maxsize = self.size - self.tell()
         size = maxsize if size is None or size < 0 else min(size, maxsize)
-        buffer = self._iostream.read(size)
+        position = self.tell()
+        self._hashto(position)
+        if self._view is not None:
+            buffer = self._view[position:position + size].tobytes()
+        else:
+            buffer = self._readbuffered(position, size)
+        self._hash(position, buffer)
         self._position += len(buffer)
+        if start is not None:
+            _emitio(self._iostream, 'readtime', time.perf_counter() - start)
         if len(buffer) < size:
             raise Error('truncated at position {}'.format(self.tell()))
         return buffer
 
+    def readable(self):
+        return True
+
+    def readall(self):
+        return self.read()
+
+    def readat(self, offset, size):
+        offset = max(0, min(offset, self.size))
+        size = max(0, min(size, self.size - offset))
+        buffer = self._readat(offset, size)
+        if len(buffer) < size:
+            position = offset + len(buffer)
+            raise Error('truncated at position {}'.format(position))
+        return buffer
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast('B')
+        position = self.tell()
+        size = min(len(view), self.size - position)
+        view = view[:size]
+        self._hashto(position)
+        if self._view is not None:
+            count = len(self._view[position:position + size])
+            view[:count] = self._view[position:position + count]
+        else:
+            count = self._readbufferedinto(position, view)
+        self._hash(position, view[:count])
+        self._position += count
+        if count < size:
+            raise Error('truncated at position {}'.format(self.tell()))
+        return count
+
+    def readinto1(self, buffer):
+        return self.readinto(buffer)
+
+    def readintoat(self, offset, buffer):
+        view = memoryview(buffer).cast('B')
+        offset = max(0, min(offset, self.size))
+        view = view[:max(0, self.size - offset)]
+        count = self._readatinto(offset, view)
+        if count < len(view):
+            position = offset + count
+            raise Error('truncated at position {}'.format(position))
+        return count
+
     def seek(self, offset, whence=io.SEEK_SET):
         if whence == io.SEEK_SET:
             position = offset
@@ -77,6 +639,11 @@ class ChunkData:
         self._position = max(0, min(position, self.size))
         return self._position
 
+    def seekable(self):
+        if self._view is not None:
+            return True
+        return self._startpos is not None and self._iostream.seekable()
+
     @property
     def size(self):
         return self._size
@@ -85,7 +652,61 @@ class ChunkData:
         return self.seek(0, io.SEEK_CUR)
 
 
+class AsyncChunkData:
+    __slots__ = ('_position', '_reader', '_size', '_startpos')
+    SKIP_BLOCK_SIZE = ChunkData.SKIP_BLOCK_SIZE
+
+    def __init__(self, reader, size, startpos=None):
+        self._reader = reader
+        self._size = size
+        self._startpos = startpos
+        self._position = 0
+
+    @classmethod
+    def streamfrom(cls, reader, size):
+        startpos = None
+        if isinstance(reader, AsyncChunkData):
+            startpos = reader.tell()
+        return cls(reader, size, startpos)
+
+    def __repr__(self):
+        return 'riff.AsyncChunkData(size={0})'.format(self.size)
+
+    async def _readstream(self, size):
+        if self._startpos is None:
+            return await _areadfully(self._reader, size)
+        await self._reader.skipto(self._startpos + self._position)
+        return await self._reader.read(size)
+
+    async def read(self, size=None):
+        maxsize = self.size - self.tell()
+        size = maxsize if size is None or size < 0 else min(size, maxsize)
+        buffer = await self._readstream(size)
+        self._position += len(buffer)
+        if len(buffer) < size:
+            raise Error('truncated at position {}'.format(self.tell()))
+        return buffer
+
+    @property
+    def size(self):
+        return self._size
+
+    async def skip(self):
+        await self.skipto(self.size)
+
+    async def skipto(self, position):
+        if position < self.tell():
+            raise io.UnsupportedOperation('chunk data is not seekable')
+        position = min(position, self.size)
+        while self.tell() < position:
+            await self.read(min(position - self.tell(), self.SKIP_BLOCK_SIZE))
+
+    def tell(self):
+        return self._position
+
+
 class Chunk:
+    __slots__ = ('_data', '_header', '_padbyte')
     DEFAULT_PAD_BYTE = b'\x00'
     PAD_SIZE = 1
 
@@ -94,6 +715,14 @@ class Chunk:
         self._data = data
         self._padbyte = padbyte
 
+    @classmethod
+    async def astreamfrom(cls, reader):
+        header = await ChunkHeader.areadfrom(reader)
+        data = AsyncChunkData.streamfrom(reader, header.size)
+        if _hooks:
+            _emit('chunk', 1)
+        return cls(header, data, None)
+
     @classmethod
     def create(cls, id, size, datastream):
         header = ChunkHeader(id, size)
@@ -103,25 +732,82 @@ class Chunk:
         return cls(header, data, padbyte)
 
     @classmethod
-    def _readfrom(cls, iostream, stream):
+    def _readfrom(cls, iostream, stream, buffersize=0, ds64=None):
         header = ChunkHeader.readfrom(iostream)
-        if not stream:
-            buffer = iostream.read(header.size)
+        prefix = b''
+        if cls._hasriffsize(header):
+            prefix = iostream.read(Ds64Chunk.PREFIX_STRUCT.size)
+            size = Ds64Chunk.unpackriffsize(prefix)
+            header = ChunkHeader(header.id, size)
+        elif ds64 is not None:
+            header = ds64.resolve(header)
+        if stream:
+            if prefix:
+                iostream = cls._unread(iostream, prefix)
+            data = ChunkData.streamfrom(iostream, header.size, buffersize)
+        else:
+            buffer = prefix + iostream.read(header.size - len(prefix))
+            if _hooks:
+                _emitio(iostream, 'read', len(buffer) - len(prefix))
+                _emit('copy', len(buffer))
             if len(buffer) < header.size:
                 raise Error('chunk data truncated')
-            iostream = io.BytesIO(buffer)
-        data = ChunkData.streamfrom(iostream, header.size)
+            data = ChunkData.frombuffer(buffer, header.size)
         padded = header.size % 2 != 0
-        padbyte = iostream.read(cls.PAD_SIZE) if padded else b''
+        if padded and stream and not data.seekable():
+            padbyte = None
+        else:
+            padbyte = iostream.read(cls.PAD_SIZE) if padded else b''
+        if _hooks:
+            _emit('chunk', 1)
         return cls(header, data, padbyte)
 
+    @staticmethod
+    def _hasriffsize(header):
+        if header.id not in ChunkHeader.RF64_IDS:
+            return False
+        return header.size == ChunkHeader.MAX_SIZE
+
+    @staticmethod
+    def _unread(iostream, prefix):
+        if isinstance(iostream, ChunkData) or iostream.seekable():
+            iostream.seek(-len(prefix), io.SEEK_CUR)
+            return iostream
+        return _PrefixedStream(prefix, iostream)
+
     @classmethod
-    def readfrom(cls, iostream):
-        return cls._readfrom(iostream, stream=False)
+    def mapfrom(cls, path):
+        return cls.unpackfrom(_mapfile(path))
+
+    @classmethod
+    def readfrom(cls, iostream, ds64=None):
+        return cls._readfrom(iostream, stream=False, ds64=ds64)
 
     @classmethod
-    def streamfrom(cls, iostream):
-        return cls._readfrom(iostream, stream=True)
+    def streamfrom(cls, iostream, buffersize=0, ds64=None):
+        return cls._readfrom(
+            iostream, stream=True, buffersize=buffersize, ds64=ds64
+        )
+
+    @classmethod
+    def unpackfrom(cls, buffer, offset=0, ds64=None):
+        buffer = memoryview(buffer)
+        header = ChunkHeader.unpackfrom(buffer, offset)
+        offset += ChunkHeader.HEADER_STRUCT.size
+        if cls._hasriffsize(header):
+            size = Ds64Chunk.unpackriffsize(buffer, offset)
+            header = ChunkHeader(header.id, size)
+        elif ds64 is not None:
+            header = ds64.resolve(header)
+        if len(buffer) - offset < header.size:
+            raise Error('chunk data truncated')
+        data = ChunkData.frombuffer(buffer, header.size, offset)
+        offset += header.size
+        padsize = cls.PAD_SIZE if header.size % 2 != 0 else 0
+        padbyte = buffer[offset:offset + padsize].tobytes()
+        if _hooks:
+            _emit('chunk', 1)
+        return cls(header, data, padbyte)
 
     def __repr__(self):
         return "riff.Chunk(id='{}', size={})".format(self.id, self.size)
@@ -142,110 +828,1985 @@ class Chunk:
     def size(self):
         return self._header.size
 
+    @property
+    def truncated(self):
+        return self.data.size < self.size
+
+    def writeto(self, iostream):
+        self._header.writeto(iostream)
+        self.data.seek(0, io.SEEK_SET)
+        self.data.copyto(iostream)
+        if self.padded:
+            padbyte = self._padbyte or self.DEFAULT_PAD_BYTE
+            iostream.write(padbyte)
 
-class RiffChunk:
-    FORMAT_STRUCT = struct.Struct('4s')
-    ID = 'RIFF'
 
-    def __init__(self, size, format, subchunks):
-        self._size = size
-        self._format = format
-        self._subchunks = subchunks
+class _PrefixedStream(io.RawIOBase):
+    def __init__(self, prefix, iostream):
+        super().__init__()
+        self._prefix = prefix
+        self._iostream = iostream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast('B')
+        if self._prefix:
+            count = min(len(view), len(self._prefix))
+            view[:count] = self._prefix[:count]
+            self._prefix = self._prefix[count:]
+            return count
+        more = self._iostream.read(len(view))
+        view[:len(more)] = more
+        return len(more)
+
+
+class Ds64Chunk:
+    __slots__ = ('_datasize', '_riffsize', '_samplecount', '_table')
+    DATA_ID = 'data'
+    FORMAT_STRUCT = struct.Struct('<QQQI')
+    ID = 'ds64'
+    PREFIX_STRUCT = struct.Struct('<4s4sIQ')
+    TABLE_STRUCT = struct.Struct('<4sQ')
+
+    def __init__(self, riffsize, datasize, samplecount=0, table=()):
+        self._riffsize = riffsize
+        self._datasize = datasize
+        self._samplecount = samplecount
+        self._table = dict(table)
 
     @classmethod
-    def _readfrom(cls, iostream, stream):
-        readchunk = Chunk.streamfrom if stream else Chunk.readfrom
-        chunk = readchunk(iostream)
+    def fromchunk(cls, chunk):
         if chunk.id != cls.ID:
             raise Error("unexpected chunk id '{}'".format(chunk.id))
-        buffer = chunk.data.read(cls.FORMAT_STRUCT.size)
-        if len(buffer) < cls.FORMAT_STRUCT.size:
-            raise Error('riff chunk format truncated')
-        formatbytes, = cls.FORMAT_STRUCT.unpack(buffer)
-        try:
-            format = formatbytes.decode('ascii')
-        except UnicodeDecodeError as error:
-            raise Error('riff chunk format not ascii-decodable') from error
-        subchunks = []
-        while chunk.data.tell() < chunk.data.size:
-            subchunk = readchunk(chunk.data)
-            subchunks.append(subchunk)
-        return cls(chunk.size, format, subchunks)
+        return cls.unpackfrom(chunk.data.read())
 
     @classmethod
-    def readfrom(cls, iostream):
-        return cls._readfrom(iostream, stream=False)
+    def unpackfrom(cls, buffer, offset=0):
+        if len(buffer) - offset < cls.FORMAT_STRUCT.size:
+            raise Error('ds64 chunk truncated')
+        riffsize, datasize, samplecount, length = (
+            cls.FORMAT_STRUCT.unpack_from(buffer, offset)
+        )
+        offset += cls.FORMAT_STRUCT.size
+        if len(buffer) - offset < length * cls.TABLE_STRUCT.size:
+            raise Error('ds64 chunk truncated')
+        table = {}
+        for index in range(length):
+            idbytes, size = cls.TABLE_STRUCT.unpack_from(buffer, offset)
+            offset += cls.TABLE_STRUCT.size
+            try:
+                table[idbytes.decode('ascii')] = size
+            except UnicodeDecodeError as error:
+                raise Error('chunk id not ascii-decodable') from error
+        return cls(riffsize, datasize, samplecount, table)
 
     @classmethod
-    def streamfrom(cls, iostream):
-        return cls._readfrom(iostream, stream=True)
+    def unpackriffsize(cls, buffer, offset=0):
+        if len(buffer) - offset < cls.PREFIX_STRUCT.size:
+            raise Error('ds64 chunk truncated')
+        _, idbytes, _, riffsize = cls.PREFIX_STRUCT.unpack_from(buffer, offset)
+        if idbytes != cls.ID.encode('ascii'):
+            raise Error('no ds64 chunk found')
+        return riffsize
+
+    def __repr__(self):
+        return 'riff.Ds64Chunk(riffsize={}, datasize={})'.format(
+            self.riffsize, self.datasize
+        )
 
     @property
-    def format(self):
-        return self._format
+    def datasize(self):
+        return self._datasize
 
     @property
-    def size(self):
-        return self._size
+    def riffsize(self):
+        return self._riffsize
 
-    def subchunks(self):
-        for subchunk in self._subchunks:
-            yield subchunk
+    @property
+    def samplecount(self):
+        return self._samplecount
 
+    def resolve(self, header):
+        if header.size != ChunkHeader.MAX_SIZE:
+            return header
+        size = self.sizefor(header.id)
+        return header if size is None else ChunkHeader(header.id, size)
 
-class WaveFormatChunk:
-    ID = 'fmt '
+    def sizefor(self, id):
+        if id == self.DATA_ID:
+            return self.datasize
+        return self._table.get(id)
+
+    def writeto(self, iostream):
+        buffer = bytearray(self.FORMAT_STRUCT.pack(
+            self.riffsize, self.datasize, self.samplecount, len(self._table)
+        ))
+        for id, size in sorted(self._table.items()):
+            buffer += self.TABLE_STRUCT.pack(id.encode('ascii'), size)
+        ChunkHeader(self.ID, len(buffer)).writeto(iostream)
+        iostream.write(buffer)
 
-    def __init__(self, channels, samplerate, samplebits):
-        self._channels = channels
-        self._samplerate = samplerate
-        self._samplebits = samplebits
+
+class ChunkIndexEntry:
+    __slots__ = ('_headerpos', '_id', '_level', '_listtype', '_size')
+
+    def __init__(self, id, level, headerpos, size, listtype=None):
+        self._id = id
+        self._level = level
+        self._headerpos = headerpos
+        self._size = size
+        self._listtype = listtype
+
+    def __repr__(self):
+        return "riff.ChunkIndexEntry(id='{}', headerpos={}, size={})".format(
+            self.id, self.headerpos, self.size
+        )
 
     @property
-    def blockalign(self):
-        return self.channels * self.samplebits / 8
+    def datapos(self):
+        return self.headerpos + ChunkHeader.HEADER_STRUCT.size
 
     @property
-    def byterate(self):
-        return self.samplerate * self.blockalign
+    def headerpos(self):
+        return self._headerpos
 
     @property
-    def channels(self):
-        return self._channels
+    def id(self):
+        return self._id
 
     @property
-    def samplebits(self):
-        return self._samplebits
+    def level(self):
+        return self._level
 
     @property
-    def samplerate(self):
-        return self._samplerate
+    def listtype(self):
+        return self._listtype
 
+    @property
+    def padded(self):
+        return self.size % 2 != 0
 
-class WaveChunk:
-    FORMAT = 'WAVE'
+    @property
+    def size(self):
+        return self._size
 
-    def __init__(self, size):
-        self._size = size
+    def streamfrom(self, iostream):
+        header = ChunkHeader(self.id, self.size)
+        data = ChunkData(iostream, self.size, self.datapos)
+        padbyte = Chunk.DEFAULT_PAD_BYTE if self.padded else b''
+        return Chunk(header, data, padbyte)
 
-    @classmethod
-    def readfrom(cls, iostream):
-        riffchunk = RiffChunk.readfrom(iostream)
-        if riffchunk.format != cls.FORMAT:
-            raise Error("'{}' != '{}'".format(riffchunk.format, cls.FORMAT))
+
+class ChunkIndex:
+    ENTRY_STRUCT = struct.Struct('<4s4sHQQ')
+    HEADER_STRUCT = struct.Struct('<4sHQqI')
+    LIST_IDS = ('RIFF', 'LIST') + ChunkHeader.RF64_IDS
+    LISTTYPE_STRUCT = struct.Struct('4s')
+    MAGIC = b'RIDX'
+    NO_LISTTYPE = b'\x00\x00\x00\x00'
+    SIDECAR_SUFFIX = '.ridx'
+    VERSION = 1
+
+    def __init__(self, entries, filesize=None, mtime=None):
+        self._ids = bytearray()
+        self._listtypes = bytearray()
+        self._levels = array.array('H')
+        self._headerpositions = array.array('Q')
+        self._sizes = array.array('Q')
+        self._filesize = filesize
+        self._mtime = mtime
+        for entry in entries:
+            self._append(entry)
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def _append(self, entry):
+        listtypebytes = self.NO_LISTTYPE
+        if entry.listtype is not None:
+            listtypebytes = entry.listtype.encode('ascii')
+        self._ids += entry.id.encode('ascii')
+        self._listtypes += listtypebytes
+        self._levels.append(entry.level)
+        self._headerpositions.append(entry.headerpos)
+        self._sizes.append(entry.size)
+
+    def _entry(self, index):
+        start = index * self.LISTTYPE_STRUCT.size
+        end = start + self.LISTTYPE_STRUCT.size
+        listtypebytes = bytes(self._listtypes[start:end])
+        listtype = None
+        if listtypebytes != self.NO_LISTTYPE:
+            listtype = listtypebytes.decode('ascii')
+        return ChunkIndexEntry(
+            self._ids[start:end].decode('ascii'), self._levels[index],
+            self._headerpositions[index], self._sizes[index], listtype
+        )
+
+    def _findpath(self, names, start, end, level):
+        id, names = names[0], names[1:]
+        for index in range(start, end):
+            if self._levels[index] != level:
+                continue
+            entry = self._entry(index)
+            if entry.id != id:
+                continue
+            if not names:
+                return entry
+            if entry.listtype != names[0]:
+                continue
+            if len(names) == 1:
+                return entry
+            childend = index + 1
+            while childend < end and self._levels[childend] > level:
+                childend += 1
+            entry = self._findpath(names[1:], index + 1, childend, level + 1)
+            if entry is not None:
+                return entry
+        return None
+
+    def _findindices(self, id):
         try:
-            formatchunk = next(
-                subchunk
-                for subchunk in riffchunk.subchunks()
-                if subchunk.id == WaveFormatChunk.ID
+            idbytes = id.encode('ascii')
+        except UnicodeEncodeError:
+            return
+        if len(idbytes) != self.LISTTYPE_STRUCT.size:
+            return
+        position = self._ids.find(idbytes)
+        while position >= 0:
+            if position % self.LISTTYPE_STRUCT.size == 0:
+                yield position // self.LISTTYPE_STRUCT.size
+            position = self._ids.find(idbytes, position + 1)
+
+    @classmethod
+    def _indexchunks(cls, iostream, position, end, level, ds64=None):
+        while position < end:
+            iostream.seek(position, io.SEEK_SET)
+            header = ChunkHeader.readfrom(iostream)
+            listtype = None
+            if header.id in cls.LIST_IDS:
+                listtype = cls._readlisttype(iostream)
+            if Chunk._hasriffsize(header):
+                ds64 = cls._readds64(iostream)
+                header = ChunkHeader(header.id, ds64.riffsize)
+            elif ds64 is not None:
+                header = ds64.resolve(header)
+            yield ChunkIndexEntry(
+                header.id, level, position, header.size, listtype
             )
-        except StopIteration:
-            raise Error('no wave format subchunk found')
+            datapos = position + ChunkHeader.HEADER_STRUCT.size
+            if listtype is not None:
+                yield from cls._indexchunks(
+                    iostream,
+                    datapos + cls.LISTTYPE_STRUCT.size,
+                    min(datapos + header.size, end),
+                    level + 1,
+                    ds64
+                )
+            position = datapos + header.size + header.size % 2
+
+    @staticmethod
+    def _readds64(iostream):
+        header = ChunkHeader.readfrom(iostream)
+        if header.id != Ds64Chunk.ID:
+            raise Error('no ds64 chunk found')
+        buffer = iostream.read(header.size)
+        if len(buffer) < header.size:
+            raise Error('ds64 chunk truncated')
+        return Ds64Chunk.unpackfrom(buffer)
+
+    @classmethod
+    def _readlisttype(cls, iostream):
+        buffer = iostream.read(cls.LISTTYPE_STRUCT.size)
+        if len(buffer) < cls.LISTTYPE_STRUCT.size:
+            raise Error('list type truncated')
+        listtypebytes, = cls.LISTTYPE_STRUCT.unpack(buffer)
+        try:
+            return listtypebytes.decode('ascii')
+        except UnicodeDecodeError as error:
+            raise Error('list type not ascii-decodable') from error
+
+    @classmethod
+    def buildfrom(cls, iostream, filesize=None, mtime=None):
+        startpos = iostream.seek(0, io.SEEK_CUR)
+        endpos = iostream.seek(0, io.SEEK_END)
+        entries = cls._indexchunks(iostream, startpos, endpos, level=0)
+        return cls(entries, filesize, mtime)
+
+    @classmethod
+    def loadfor(cls, path, sidecarpath=None):
+        if sidecarpath is None:
+            sidecarpath = path + cls.SIDECAR_SUFFIX
+        try:
+            with open(sidecarpath, 'rb') as iostream:
+                index = cls.readfrom(iostream)
+            if index.matches(path):
+                return index
+        except (OSError, Error):
+            pass
+        stat = os.stat(path)
+        with open(path, 'rb') as iostream:
+            index = cls.buildfrom(iostream, stat.st_size, stat.st_mtime_ns)
+        try:
+            temppath = '{}.{}.tmp'.format(sidecarpath, os.getpid())
+            with open(temppath, 'wb') as iostream:
+                index.writeto(iostream)
+            os.replace(temppath, sidecarpath)
+        except OSError:
+            pass
+        return index
+
+    @classmethod
+    def readfrom(cls, iostream):
+        buffer = iostream.read(cls.HEADER_STRUCT.size)
+        if len(buffer) < cls.HEADER_STRUCT.size:
+            raise Error('chunk index truncated')
+        magic, version, filesize, mtime, count = cls.HEADER_STRUCT.unpack(
+            buffer
+        )
+        if magic != cls.MAGIC:
+            raise Error('chunk index not recognised')
+        if version != cls.VERSION:
+            raise Error('chunk index version {} unsupported'.format(version))
+        buffer = iostream.read(count * cls.ENTRY_STRUCT.size)
+        if len(buffer) < count * cls.ENTRY_STRUCT.size:
+            raise Error('chunk index truncated')
+        index = cls((), filesize, None if mtime < 0 else mtime)
+        for idbytes, listtypebytes, level, headerpos, size in (
+                cls.ENTRY_STRUCT.iter_unpack(buffer)):
+            index._ids += idbytes
+            index._listtypes += listtypebytes
+            index._levels.append(level)
+            index._headerpositions.append(headerpos)
+            index._sizes.append(size)
+        return index
 
     @property
-    def id(self):
-        return self.ID
+    def filesize(self):
+        return self._filesize
 
     @property
-    def size(self):
-        return self._size
+    def mtime(self):
+        return self._mtime
+
+    def entries(self):
+        for index in range(len(self)):
+            yield self._entry(index)
+
+    def find(self, id):
+        return next(self.findall(id), None)
+
+    def findall(self, id):
+        for index in self._findindices(id):
+            yield self._entry(index)
+
+    def findpath(self, path):
+        end = 1
+        while end < len(self) and self._levels[end] > 0:
+            end += 1
+        names = path.split(RiffChunk.PATH_SEPARATOR)
+        return self._findpath(names, 1, end, 1)
+
+    def matches(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return (
+            self.filesize == stat.st_size and self.mtime == stat.st_mtime_ns
+        )
+
+    def writeto(self, iostream):
+        filesize = 0 if self.filesize is None else self.filesize
+        mtime = -1 if self.mtime is None else self.mtime
+        buffer = bytearray(self.HEADER_STRUCT.pack(
+            self.MAGIC, self.VERSION, filesize, mtime, len(self)
+        ))
+        size = self.LISTTYPE_STRUCT.size
+        for index in range(len(self)):
+            start = index * size
+            buffer += self.ENTRY_STRUCT.pack(
+                bytes(self._ids[start:start + size]),
+                bytes(self._listtypes[start:start + size]),
+                self._levels[index], self._headerpositions[index],
+                self._sizes[index]
+            )
+        iostream.write(buffer)
+
+
+class _SubchunkTable:
+    __slots__ = ('_buffer', '_chunks', '_ids', '_offsets', '_sizes')
+    ID_SIZE = ChunkHeader.HEADER_STRUCT.size // 2
+
+    def __init__(self, buffer=None):
+        self._buffer = buffer
+        self._chunks = {}
+        self._ids = bytearray()
+        self._offsets = array.array('Q')
+        self._sizes = array.array('Q')
+
+    def __getitem__(self, index):
+        chunk = self._chunks.get(index)
+        if chunk is not None:
+            return chunk
+        start = index * self.ID_SIZE
+        header = ChunkHeader(
+            self._ids[start:start + self.ID_SIZE].decode('ascii'),
+            self._sizes[index]
+        )
+        offset = self._offsets[index]
+        data = ChunkData.frombuffer(self._buffer, header.size, offset)
+        padpos = offset + header.size
+        padbyte = self._buffer[padpos:padpos + header.size % 2].tobytes()
+        chunk = self._chunks[index] = Chunk(header, data, padbyte)
+        return chunk
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def append(self, chunk):
+        self._chunks[len(self)] = chunk
+        self.appendentry(chunk.id, chunk.size, 0)
+
+    def appendentry(self, id, size, offset):
+        self._ids += id.encode('ascii')
+        self._sizes.append(size)
+        self._offsets.append(offset)
+
+    def find(self, id, start=0):
+        try:
+            idbytes = id.encode('ascii')
+        except UnicodeEncodeError:
+            return -1
+        if len(idbytes) != self.ID_SIZE:
+            return -1
+        position = self._ids.find(idbytes, start * self.ID_SIZE)
+        while position > 0 and position % self.ID_SIZE != 0:
+            position = self._ids.find(idbytes, position + 1)
+        return position // self.ID_SIZE if position >= 0 else -1
+
+
+class RiffChunk:
+    __slots__ = (
+        '_apending', '_format', '_pending', '_size', '_sublists',
+        '_subchunks'
+    )
+    FORMAT_STRUCT = struct.Struct('4s')
+    FOURCC_PATTERN = re.compile(b'(?=[0-9A-Za-z][0-9A-Za-z _]{3})')
+    HASH_ANY_ID = '*'
+    ID = 'RIFF'
+    LARGE_IDS = ChunkHeader.RF64_IDS
+    PATH_SEPARATOR = '/'
+
+    def __init__(self, size, format, subchunks, buffer=None):
+        self._size = size
+        self._format = format
+        self._subchunks = _SubchunkTable(buffer)
+        self._sublists = {}
+        if hasattr(subchunks, '__anext__'):
+            self._pending = iter(())
+            self._apending = subchunks
+        else:
+            self._pending = iter(subchunks)
+            self._apending = None
+
+    def _appendsubchunk(self, subchunk):
+        if isinstance(subchunk, tuple):
+            self._subchunks.appendentry(*subchunk)
+        else:
+            self._subchunks.append(subchunk)
+
+    @classmethod
+    def _checkid(cls, chunk):
+        if chunk.id != cls.ID and chunk.id not in cls.LARGE_IDS:
+            raise Error("unexpected chunk id '{}'".format(chunk.id))
+
+    @classmethod
+    def _readformat(cls, chunk):
+        cls._checkid(chunk)
+        return cls._unpackformat(chunk.data.read(cls.FORMAT_STRUCT.size))
+
+    @classmethod
+    def _unpackformat(cls, buffer):
+        if len(buffer) < cls.FORMAT_STRUCT.size:
+            raise Error('riff chunk format truncated')
+        formatbytes, = cls.FORMAT_STRUCT.unpack(buffer)
+        try:
+            format = formatbytes.decode('ascii')
+        except UnicodeDecodeError as error:
+            raise Error('riff chunk format not ascii-decodable') from error
+        return format
+
+    @classmethod
+    def _readfrom(cls, iostream, stream, lazy, buffersize=0, hashes=None):
+        if not stream:
+            return cls._unpackfrom(Chunk.readfrom(iostream), lazy)
+        chunk = Chunk.streamfrom(iostream, buffersize)
+        format = cls._readformat(chunk)
+        subchunks = cls._streamsubchunks(
+            chunk.data, chunk.data.tell(), buffersize, hashes
+        )
+        if not lazy and chunk.data.seekable():
+            subchunks = list(subchunks)
+        return cls(chunk.size, format, subchunks)
+
+    @classmethod
+    def _unpackfrom(cls, chunk, lazy):
+        format = cls._readformat(chunk)
+        buffer = chunk.data.getbuffer()
+        subchunks = cls._unpacksubchunks(buffer, cls.FORMAT_STRUCT.size)
+        riffchunk = cls(chunk.size, format, subchunks, buffer)
+        if not lazy:
+            while riffchunk._readsubchunk():
+                pass
+        return riffchunk
+
+    @classmethod
+    def _recoverheader(cls, buffer, offset):
+        if not cls.FOURCC_PATTERN.match(buffer, offset):
+            return None
+        return ChunkHeader.unpackfrom(buffer, offset)
+
+    @classmethod
+    def _recoversubchunks(cls, buffer, offset, end, bounded):
+        ds64 = None
+        while end - offset >= ChunkHeader.HEADER_STRUCT.size:
+            header = cls._recoverheader(buffer, offset)
+            if header is None:
+                offset = cls._resync(buffer, offset + 1, end)
+                continue
+            if ds64 is not None:
+                header = ds64.resolve(header)
+            datapos = offset + ChunkHeader.HEADER_STRUCT.size
+            if bounded and datapos + header.size > end:
+                nextpos = cls._resync(buffer, datapos, end, chained=True)
+                if nextpos < end:
+                    header = ChunkHeader(header.id, nextpos - datapos)
+            available = min(header.size, end - datapos)
+            data = ChunkData.frombuffer(buffer, available, datapos)
+            padpos = datapos + available
+            padsize = Chunk.PAD_SIZE if header.size % 2 != 0 else 0
+            padbyte = buffer[padpos:padpos + padsize].tobytes()
+            subchunk = Chunk(header, data, padbyte)
+            if not subchunk.truncated:
+                try:
+                    ds64 = cls._readds64(subchunk, ds64)
+                except Error:
+                    pass
+            yield subchunk
+            offset = padpos + padsize
+
+    @classmethod
+    def _resync(cls, buffer, offset, end, chained=False):
+        lastpos = end - ChunkHeader.HEADER_STRUCT.size
+        for match in cls.FOURCC_PATTERN.finditer(buffer, offset, end):
+            position = match.start()
+            if position > lastpos:
+                break
+            if chained:
+                found = cls._chainsto(buffer, position, end)
+            else:
+                header = ChunkHeader.unpackfrom(buffer, position)
+                nextpos = position + ChunkHeader.HEADER_STRUCT.size
+                found = nextpos + header.size <= end
+            if found:
+                return position
+        return end
+
+    @classmethod
+    def _chainsto(cls, buffer, position, end):
+        while end - position >= ChunkHeader.HEADER_STRUCT.size:
+            header = cls._recoverheader(buffer, position)
+            if header is None:
+                return False
+            position += ChunkHeader.HEADER_STRUCT.size + header.size
+            if position == end:
+                return True
+            position += header.size % 2
+        return position == end
+
+    @staticmethod
+    def _readds64(subchunk, ds64):
+        if ds64 is not None or subchunk.id != Ds64Chunk.ID:
+            return ds64
+        ds64 = Ds64Chunk.fromchunk(subchunk)
+        subchunk.data.seek(0, io.SEEK_SET)
+        return ds64
+
+    @classmethod
+    def _hashalgorithms(cls, hashes, id):
+        return (
+            list(hashes.get(cls.HASH_ANY_ID, ())) + list(hashes.get(id, ()))
+        )
+
+    @classmethod
+    def _streamsubchunks(cls, data, position, buffersize, hashes=None):
+        ds64 = subchunk = None
+        while position < data.size:
+            if subchunk is not None:
+                subchunk.data._finishhash()
+            data.seek(position, io.SEEK_SET)
+            subchunk = Chunk.streamfrom(data, buffersize, ds64)
+            for algorithm in cls._hashalgorithms(hashes or {}, subchunk.id):
+                subchunk.data.addhash(algorithm)
+            position += ChunkHeader.HEADER_STRUCT.size + subchunk.size
+            position += Chunk.PAD_SIZE if subchunk.padded else 0
+            ds64 = cls._readds64(subchunk, ds64)
+            yield subchunk
+        if subchunk is not None:
+            subchunk.data._finishhash()
+
+    @staticmethod
+    def _unpacksubchunks(buffer, offset):
+        ds64 = None
+        while offset < len(buffer):
+            header = ChunkHeader.unpackfrom(buffer, offset)
+            datapos = offset + ChunkHeader.HEADER_STRUCT.size
+            if Chunk._hasriffsize(header):
+                size = Ds64Chunk.unpackriffsize(buffer, datapos)
+                header = ChunkHeader(header.id, size)
+            elif ds64 is not None:
+                header = ds64.resolve(header)
+            offset = datapos + header.size
+            if len(buffer) < offset:
+                raise Error('chunk data truncated')
+            if ds64 is None and header.id == Ds64Chunk.ID:
+                ds64 = Ds64Chunk.unpackfrom(buffer[datapos:offset])
+            if _hooks:
+                _emit('chunk', 1)
+            yield header.id, header.size, datapos
+            offset += header.size % 2
+
+    async def _areadsubchunk(self):
+        if self._apending is None:
+            return self._readsubchunk()
+        try:
+            subchunk = await self._apending.__anext__()
+        except StopAsyncIteration:
+            self._apending = None
+            return False
+        self._appendsubchunk(subchunk)
+        return True
+
+    @classmethod
+    async def astreamfrom(cls, reader):
+        chunk = await Chunk.astreamfrom(reader)
+        cls._checkid(chunk)
+        format = cls._unpackformat(
+            await chunk.data.read(cls.FORMAT_STRUCT.size)
+        )
+        subchunks = _AsyncSubchunkReader(chunk.data)
+        return cls(chunk.size, format, subchunks)
+
+    def asubchunks(self):
+        return _AsyncSubchunkIterator(self)
+
+    def _findall(self, names):
+        id, names = names[0], names[1:]
+        for index in self._findindices(id):
+            if not names:
+                yield self._subchunks[index]
+            elif id in (ListChunk.ID, RiffChunk.ID):
+                sublist = self._sublist(index)
+                if sublist.format != names[0]:
+                    continue
+                if len(names) == 1:
+                    yield sublist
+                else:
+                    yield from sublist._findall(names[1:])
+
+    def _findindices(self, id):
+        start = 0
+        while True:
+            index = self._subchunks.find(id, start)
+            if index >= 0:
+                yield index
+                start = index + 1
+                continue
+            start = len(self._subchunks)
+            if not self._readsubchunk():
+                return
+
+    def _sublist(self, index):
+        if index not in self._sublists:
+            subchunk = self._subchunks[index]
+            listchunktype = ListChunk
+            if subchunk.id == RiffChunk.ID:
+                listchunktype = RiffChunk
+            self._sublists[index] = listchunktype.fromchunk(subchunk)
+        return self._sublists[index]
+
+    def digests(self):
+        for subchunk in self.subchunks():
+            yield subchunk.id, subchunk.data.digests()
+
+    def find(self, path):
+        return next(self.findall(path), None)
+
+    def findall(self, path):
+        return self._findall(path.split(self.PATH_SEPARATOR))
+
+    @classmethod
+    def fromchunk(cls, chunk):
+        cls._checkid(chunk)
+        if chunk.data.seekable():
+            chunk.data.seek(0, io.SEEK_SET)
+        format = cls._unpackformat(chunk.data.read(cls.FORMAT_STRUCT.size))
+        try:
+            buffer = chunk.data.getbuffer()
+        except io.UnsupportedOperation:
+            subchunks = cls._streamsubchunks(
+                chunk.data, chunk.data.tell(), chunk.data.buffersize
+            )
+        else:
+            subchunks = cls._unpacksubchunks(buffer, cls.FORMAT_STRUCT.size)
+            return cls(chunk.size, format, subchunks, buffer)
+        return cls(chunk.size, format, subchunks)
+
+    @classmethod
+    def fromindex(cls, index, iostream):
+        entries = index.entries()
+        entry = next(entries, None)
+        if entry is None:
+            raise Error('chunk index empty')
+        if entry.id != cls.ID:
+            raise Error("unexpected chunk id '{}'".format(entry.id))
+        subchunks = cls._indexsubchunks(entry, entries, iostream)
+        return cls(entry.size, entry.listtype, subchunks)
+
+    @staticmethod
+    def _indexsubchunks(parent, entries, iostream):
+        for entry in entries:
+            if entry.level <= parent.level:
+                break
+            if entry.level == parent.level + 1:
+                yield entry.streamfrom(iostream)
+
+    @classmethod
+    def mapfrom(cls, path, lazy=False):
+        return cls._unpackfrom(Chunk.mapfrom(path), lazy)
+
+    @classmethod
+    def readfrom(cls, iostream, lazy=False):
+        return cls._readfrom(iostream, stream=False, lazy=lazy)
+
+    @classmethod
+    def recoverfrom(cls, buffer, offset=0):
+        buffer = memoryview(buffer)
+        header = ChunkHeader.unpackfrom(buffer, offset)
+        cls._checkid(header)
+        datapos = offset + ChunkHeader.HEADER_STRUCT.size
+        format = cls._unpackformat(
+            buffer[datapos:datapos + cls.FORMAT_STRUCT.size]
+        )
+        start = datapos + cls.FORMAT_STRUCT.size
+        end = datapos + header.size
+        if end < start or Chunk._hasriffsize(header):
+            end = None
+        bounded = end is not None and end <= len(buffer)
+        if not bounded:
+            end = len(buffer)
+        subchunks = cls._recoversubchunks(buffer, start, end, bounded)
+        return cls(header.size, format, list(subchunks))
+
+    @classmethod
+    def streamfrom(cls, iostream, lazy=False, buffersize=0, hashes=None):
+        return cls._readfrom(
+            iostream, stream=True, lazy=lazy, buffersize=buffersize,
+            hashes=hashes
+        )
+
+    @classmethod
+    def unpackfrom(cls, buffer, offset=0, lazy=False):
+        return cls._unpackfrom(Chunk.unpackfrom(buffer, offset), lazy)
+
+    @property
+    def format(self):
+        return self._format
+
+    @property
+    def size(self):
+        return self._size
+
+    def _readsubchunk(self):
+        subchunk = next(self._pending, None)
+        if subchunk is None:
+            return False
+        self._appendsubchunk(subchunk)
+        return True
+
+    def subchunks(self):
+        index = 0
+        while index < len(self._subchunks) or self._readsubchunk():
+            yield self._subchunks[index]
+            index += 1
+
+
+class ListChunk(RiffChunk):
+    __slots__ = ()
+    ID = 'LIST'
+    LARGE_IDS = ()
+
+    @property
+    def listtype(self):
+        return self.format
+
+
+class _AsyncSubchunkIterator:
+    def __init__(self, riffchunk):
+        self._riffchunk = riffchunk
+        self._index = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        subchunks = self._riffchunk._subchunks
+        if self._index >= len(subchunks):
+            if not await self._riffchunk._areadsubchunk():
+                raise StopAsyncIteration
+        self._index += 1
+        return subchunks[self._index - 1]
+
+
+class _AsyncSubchunkReader:
+    def __init__(self, data):
+        self._data = data
+        self._position = data.tell()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._position >= self._data.size:
+            raise StopAsyncIteration
+        await self._data.skipto(self._position)
+        subchunk = await Chunk.astreamfrom(self._data)
+        self._position += ChunkHeader.HEADER_STRUCT.size + subchunk.size
+        self._position += Chunk.PAD_SIZE if subchunk.padded else 0
+        return subchunk
+
+
+class ChunkWriter:
+    def __init__(self, iostream, id, largesizes=None):
+        self._iostream = iostream
+        self._id = id
+        self._headerpos = iostream.tell()
+        self._size = None
+        self._largesizes = largesizes
+        ChunkHeader(id, 0).writeto(iostream)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return "riff.ChunkWriter(id='{}')".format(self.id)
+
+    def _checkopen(self):
+        if self.closed:
+            raise ValueError('chunk writer is closed')
+
+    def _header(self, size):
+        if size <= ChunkHeader.MAX_SIZE:
+            return ChunkHeader(self.id, size)
+        promotable = self._largesizes is not None
+        promotable = promotable and self.id == Ds64Chunk.DATA_ID
+        if not promotable or self.id in self._largesizes:
+            raise Error('chunk size {} too large'.format(size))
+        self._largesizes[self.id] = size
+        return ChunkHeader(self.id, ChunkHeader.MAX_SIZE)
+
+    def close(self):
+        if self.closed:
+            return
+        datapos = self._headerpos + ChunkHeader.HEADER_STRUCT.size
+        endpos = self._iostream.tell()
+        size = endpos - datapos
+        header = self._header(size)
+        if size % 2 != 0:
+            self._iostream.write(Chunk.DEFAULT_PAD_BYTE)
+            endpos += Chunk.PAD_SIZE
+        self._iostream.seek(self._headerpos, io.SEEK_SET)
+        header.writeto(self._iostream)
+        self._iostream.seek(endpos, io.SEEK_SET)
+        self._size = size
+
+    @property
+    def closed(self):
+        return self._size is not None
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def size(self):
+        return self._size
+
+    def write(self, buffer):
+        self._checkopen()
+        self._iostream.write(buffer)
+        return memoryview(buffer).nbytes
+
+    def writefrom(self, data):
+        self._checkopen()
+        return data.copyto(self._iostream)
+
+
+class ListWriter(ChunkWriter):
+    ID = 'LIST'
+    LISTTYPE_STRUCT = struct.Struct('4s')
+
+    def __init__(self, iostream, listtype, id=ID, largesizes=None):
+        super().__init__(iostream, id, largesizes)
+        self._listtype = listtype
+        self._subchunk = None
+        iostream.write(self.LISTTYPE_STRUCT.pack(listtype.encode('ascii')))
+
+    def __repr__(self):
+        return "riff.ListWriter(listtype='{}')".format(self.listtype)
+
+    def _opensubchunk(self, writertype, *args):
+        self._checkopen()
+        self._closesubchunk()
+        self._subchunk = writertype(
+            self._iostream, *args, largesizes=self._largesizes
+        )
+        return self._subchunk
+
+    def _closesubchunk(self):
+        if self._subchunk is not None:
+            self._subchunk.close()
+            self._subchunk = None
+
+    def close(self):
+        if not self.closed:
+            self._closesubchunk()
+        super().close()
+
+    @property
+    def listtype(self):
+        return self._listtype
+
+    def sublist(self, listtype):
+        return self._opensubchunk(ListWriter, listtype)
+
+    def subchunk(self, id):
+        return self._opensubchunk(ChunkWriter, id)
+
+    def write(self, buffer):
+        self._closesubchunk()
+        return super().write(buffer)
+
+    def writechunk(self, chunk):
+        self._checkopen()
+        self._closesubchunk()
+        chunk.writeto(self._iostream)
+
+
+class RiffWriter(ListWriter):
+    ID = RiffChunk.ID
+    JUNK_ID = 'JUNK'
+    RF64_ID = 'RF64'
+
+    def __init__(self, iostream, format, reserve=True):
+        super().__init__(iostream, format, self.ID, largesizes={})
+        self._ds64pos = None
+        if reserve:
+            self._ds64pos = iostream.tell()
+            size = Ds64Chunk.FORMAT_STRUCT.size
+            ChunkHeader(self.JUNK_ID, size).writeto(iostream)
+            iostream.write(bytes(size))
+
+    def __repr__(self):
+        return "riff.RiffWriter(format='{}')".format(self.format)
+
+    def _header(self, size):
+        if size <= ChunkHeader.MAX_SIZE and not self._largesizes:
+            return super()._header(size)
+        if self._ds64pos is None:
+            raise Error('chunk size {} too large'.format(size))
+        datasize = self._largesizes.get(Ds64Chunk.DATA_ID, 0)
+        endpos = self._iostream.tell()
+        self._iostream.seek(self._ds64pos, io.SEEK_SET)
+        Ds64Chunk(size, datasize).writeto(self._iostream)
+        self._iostream.seek(endpos, io.SEEK_SET)
+        return ChunkHeader(self.RF64_ID, ChunkHeader.MAX_SIZE)
+
+    @property
+    def format(self):
+        return self.listtype
+
+
+class ChunkCache:
+    def __init__(self, maxentries=128, maxbytes=0):
+        self._maxentries = maxentries
+        self._maxbytes = maxbytes
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._payloads = collections.OrderedDict()
+        self._payloadbytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __repr__(self):
+        return 'riff.ChunkCache(hits={}, misses={}, evictions={})'.format(
+            self.hits, self.misses, self.evictions
+        )
+
+    def _formatchunk(self, path, count):
+        key = self._key(path) + (WaveFormatChunk.ID,)
+        formatchunk = self._get(self._entries, key, count)
+        if formatchunk is None:
+            index = self._index(path, count=False)
+            entry = self._findentry(index, WaveFormatChunk.ID)
+            with open(path, 'rb') as iostream:
+                chunk = entry.streamfrom(iostream)
+                formatchunk = WaveFormatChunk.fromchunk(chunk)
+            self._putentry(key, formatchunk)
+        return formatchunk
+
+    def _get(self, cache, key, count=True):
+        with self._lock:
+            value = cache.get(key)
+            if value is None:
+                self._misses += int(count)
+            else:
+                self._hits += int(count)
+                cache.move_to_end(key)
+            return value
+
+    def _index(self, path, count):
+        key = self._key(path)
+        index = self._get(self._entries, key, count)
+        if index is None:
+            with open(path, 'rb') as iostream:
+                index = ChunkIndex.buildfrom(iostream, key[1], key[2])
+            self._putentry(key, index)
+        return index
+
+    @staticmethod
+    def _findentry(index, chunkpath):
+        entry = index.findpath(chunkpath)
+        if entry is None:
+            raise Error("no '{}' chunk found".format(chunkpath))
+        return entry
+
+    @staticmethod
+    def _key(path):
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+    def _putentry(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxentries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def _putpayload(self, key, payload):
+        if len(payload) > self._maxbytes:
+            return
+        with self._lock:
+            if key in self._payloads:
+                return
+            self._payloads[key] = payload
+            self._payloadbytes += len(payload)
+            while self._payloadbytes > self._maxbytes:
+                _, evicted = self._payloads.popitem(last=False)
+                self._payloadbytes -= len(evicted)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._payloads.clear()
+            self._payloadbytes = 0
+
+    @property
+    def evictions(self):
+        return self._evictions
+
+    def formatchunk(self, path):
+        return self._formatchunk(path, count=True)
+
+    @property
+    def hits(self):
+        return self._hits
+
+    def index(self, path):
+        return self._index(path, count=True)
+
+    @property
+    def misses(self):
+        return self._misses
+
+    @property
+    def payloadbytes(self):
+        return self._payloadbytes
+
+    def payload(self, path, chunkpath, size=None):
+        key = self._key(path) + (chunkpath, size)
+        payload = self._get(self._payloads, key)
+        if payload is None:
+            entry = self._findentry(self._index(path, count=False), chunkpath)
+            size = entry.size if size is None else min(size, entry.size)
+            with open(path, 'rb') as iostream:
+                payload = entry.streamfrom(iostream).data.readat(0, size)
+            self._putpayload(key, payload)
+        return payload
+
+    def riffchunk(self, path, iostream):
+        return RiffChunk.fromindex(self.index(path), iostream)
+
+    def wavechunk(self, path, iostream):
+        index = self.index(path)
+        root = next(index.entries(), None)
+        if root is None:
+            raise Error('chunk index empty')
+        if root.listtype != WaveChunk.FORMAT:
+            raise Error("'{}' != '{}'".format(root.listtype, WaveChunk.FORMAT))
+        entry = self._findentry(index, WaveChunk.DATA_ID)
+        return WaveChunk(
+            root.size, self._formatchunk(path, count=False),
+            entry.streamfrom(iostream)
+        )
+
+
+class RiffEditor:
+    JUNK_ID = 'JUNK'
+    MOVE_LIMIT = 1024 * 1024
+
+    def __init__(self, iostream):
+        self._iostream = iostream
+        self._reindex()
+
+    def __repr__(self):
+        return "riff.RiffEditor(format='{}')".format(self.format)
+
+    def _patchsize(self, riffend):
+        self._iostream.seek(self._root.headerpos, io.SEEK_SET)
+        size = riffend - self._root.datapos
+        ChunkHeader(self._root.id, size).writeto(self._iostream)
+        if self._fileend == self._riffend():
+            self._iostream.truncate(riffend)
+        self._reindex()
+
+    def _reindex(self):
+        self._iostream.seek(0, io.SEEK_SET)
+        entries = list(ChunkIndex.buildfrom(self._iostream).entries())
+        if entries and entries[0].id in ChunkHeader.RF64_IDS:
+            raise Error('rf64 chunks cannot be edited')
+        if not entries or entries[0].id != RiffChunk.ID:
+            raise Error('no riff chunk found')
+        self._root = entries[0]
+        self._entries = [entry for entry in entries if entry.level == 1]
+        self._fileend = self._iostream.seek(0, io.SEEK_END)
+
+    def _riffend(self):
+        return self._root.datapos + self._root.size
+
+    @staticmethod
+    def _span(size):
+        return ChunkHeader.HEADER_STRUCT.size + size + size % 2
+
+    def _writechunk(self, position, id, data):
+        self._iostream.seek(position, io.SEEK_SET)
+        ChunkHeader(id, len(data)).writeto(self._iostream)
+        self._iostream.write(data)
+        if len(data) % 2 != 0:
+            self._iostream.write(Chunk.DEFAULT_PAD_BYTE)
+        return position + self._span(len(data))
+
+    def _writejunk(self, position, span):
+        self._iostream.seek(position, io.SEEK_SET)
+        size = span - ChunkHeader.HEADER_STRUCT.size
+        ChunkHeader(self.JUNK_ID, size).writeto(self._iostream)
+
+    def _checkappend(self):
+        if self._fileend != self._riffend():
+            raise Error('riff chunk does not end at end of file')
+
+    def append(self, id, data):
+        data = bytes(data)
+        self._checkappend()
+        self._patchsize(self._writechunk(self._riffend(), id, data))
+
+    def entries(self):
+        for entry in self._entries:
+            yield entry
+
+    def find(self, id, listtype=None):
+        for entry in self._entries:
+            if entry.id == id and listtype in (None, entry.listtype):
+                return entry
+        return None
+
+    @property
+    def format(self):
+        return self._root.listtype
+
+    def remove(self, id, listtype=None):
+        entry = self.find(id, listtype)
+        if entry is None:
+            raise Error("no '{}' chunk found".format(id))
+        self._writejunk(entry.headerpos, self._span(entry.size))
+        self._reindex()
+
+    def replace(self, id, data, listtype=None):
+        data = bytes(data)
+        entry = self.find(id, listtype)
+        if entry is None:
+            self.append(id, data)
+            return
+        index = self._entries.index(entry)
+        following = self._entries[index + 1:]
+        available = self._span(entry.size)
+        while following and following[0].id == self.JUNK_ID:
+            available += self._span(following.pop(0).size)
+        required = self._span(len(data))
+        atend = self._fileend == self._riffend()
+        movesize = self._riffend() - following[0].headerpos if following else 0
+        if not following and atend:
+            riffend = self._writechunk(entry.headerpos, id, data)
+            self._patchsize(riffend)
+        elif required == available:
+            self._writechunk(entry.headerpos, id, data)
+            self._reindex()
+        elif available - required >= ChunkHeader.HEADER_STRUCT.size:
+            junkpos = self._writechunk(entry.headerpos, id, data)
+            self._writejunk(junkpos, available - required)
+            self._reindex()
+        elif atend and movesize <= self.MOVE_LIMIT:
+            self._iostream.seek(following[0].headerpos, io.SEEK_SET)
+            trailing = self._iostream.read(movesize)
+            position = self._writechunk(entry.headerpos, id, data)
+            self._iostream.seek(position, io.SEEK_SET)
+            self._iostream.write(trailing)
+            self._patchsize(position + len(trailing))
+        else:
+            self._checkappend()
+            self._writejunk(entry.headerpos, self._span(entry.size))
+            self._reindex()
+            self.append(id, data)
+
+    @property
+    def size(self):
+        return self._root.size
+
+
+class IOStats:
+    def __init__(self):
+        self._counts = {}
+        self._totals = {}
+
+    def __enter__(self):
+        addhook(self.record)
+        return self
+
+    def __exit__(self, *exc_info):
+        removehook(self.record)
+
+    def __repr__(self):
+        return 'riff.IOStats(seeks={}, reads={}, bytesread={})'.format(
+            self.seeks, self.reads, self.bytesread
+        )
+
+    @property
+    def bytescopied(self):
+        return self._totals.get('copy', 0)
+
+    @property
+    def bytesread(self):
+        return self._totals.get('read', 0)
+
+    @property
+    def chunks(self):
+        return self._totals.get('chunk', 0)
+
+    @property
+    def headertime(self):
+        return self._totals.get('headertime', 0.0)
+
+    @property
+    def reads(self):
+        return self._counts.get('read', 0)
+
+    @property
+    def readtime(self):
+        return self._totals.get('readtime', 0.0)
+
+    def record(self, event, value):
+        self._counts[event] = self._counts.get(event, 0) + 1
+        self._totals[event] = self._totals.get(event, 0) + value
+
+    @property
+    def seeks(self):
+        return self._counts.get('seek', 0)
+
+
+class ScanResult:
+    def __init__(self, path, format=None, subchunks=(), formatchunk=None,
+                 error=None):
+        self._path = path
+        self._format = format
+        self._subchunks = list(subchunks)
+        self._formatchunk = formatchunk
+        self._error = error
+
+    def __repr__(self):
+        if self.error is not None:
+            return 'riff.ScanResult(path={!r}, error={!r})'.format(
+                self.path, str(self.error)
+            )
+        return 'riff.ScanResult(path={!r}, format={!r})'.format(
+            self.path, self.format
+        )
+
+    @property
+    def error(self):
+        return self._error
+
+    @property
+    def format(self):
+        return self._format
+
+    @property
+    def formatchunk(self):
+        return self._formatchunk
+
+    @property
+    def path(self):
+        return self._path
+
+    def subchunks(self):
+        for subchunk in self._subchunks:
+            yield subchunk
+
+
+class WaveFormatChunk:
+    __slots__ = ('_channels', '_formattag', '_samplebits', '_samplerate')
+    EXTENSIBLE_STRUCT = struct.Struct('<HHIH14s')
+    FORMAT_STRUCT = struct.Struct('<HHIIHH')
+    ID = 'fmt '
+    WAVE_FORMAT_PCM = 0x0001
+    WAVE_FORMAT_IEEE_FLOAT = 0x0003
+    WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+    TYPECODES = {
+        (WAVE_FORMAT_PCM, 8): 'B',
+        (WAVE_FORMAT_PCM, 16): 'h',
+        (WAVE_FORMAT_PCM, 32): 'i',
+        (WAVE_FORMAT_IEEE_FLOAT, 32): 'f',
+        (WAVE_FORMAT_IEEE_FLOAT, 64): 'd',
+    }
+    SIGN_EXTENSION = bytes(0xff if byte & 0x80 else 0 for byte in range(256))
+
+    def __init__(self, channels, samplerate, samplebits,
+                 formattag=WAVE_FORMAT_PCM):
+        self._channels = channels
+        self._samplerate = samplerate
+        self._samplebits = samplebits
+        self._formattag = formattag
+
+    @classmethod
+    def fromchunk(cls, chunk):
+        if chunk.id != cls.ID:
+            raise Error("unexpected chunk id '{}'".format(chunk.id))
+        buffer = chunk.data.read()
+        if len(buffer) < cls.FORMAT_STRUCT.size:
+            raise Error('wave format chunk truncated')
+        formattag, channels, samplerate, _, _, samplebits = (
+            cls.FORMAT_STRUCT.unpack_from(buffer)
+        )
+        extensionsize = len(buffer) - cls.FORMAT_STRUCT.size
+        extensible = formattag == cls.WAVE_FORMAT_EXTENSIBLE
+        if extensible and extensionsize >= cls.EXTENSIBLE_STRUCT.size:
+            _, _, _, formattag, _ = cls.EXTENSIBLE_STRUCT.unpack_from(
+                buffer, cls.FORMAT_STRUCT.size
+            )
+        return cls(channels, samplerate, samplebits, formattag)
+
+    def __repr__(self):
+        return (
+            'riff.WaveFormatChunk(channels={}, samplerate={}, samplebits={})'
+        ).format(self.channels, self.samplerate, self.samplebits)
+
+    def _floattype(self):
+        if (self.formattag, self.samplebits) in (
+                (self.WAVE_FORMAT_PCM, 32), (self.WAVE_FORMAT_IEEE_FLOAT, 64)):
+            return numpy.float64
+        return numpy.float32
+
+    def _checkencodable(self):
+        isfloat = self.formattag == self.WAVE_FORMAT_IEEE_FLOAT
+        if isfloat and self.samplebits in (32, 64):
+            return
+        ispcm = self.formattag == self.WAVE_FORMAT_PCM
+        if not ispcm or self.samplebits not in (8, 16, 24, 32):
+            raise Error('unsupported sample format {}/{}'.format(
+                self.formattag, self.samplebits
+            ))
+
+    def _decodearray(self, view, frames):
+        raw = numpy.frombuffer(view, dtype=numpy.uint8)
+        if (self.formattag, self.samplebits) == (self.WAVE_FORMAT_PCM, 24):
+            widened = numpy.zeros((len(raw) // 3, 4), dtype=numpy.uint8)
+            widened[:, 1:] = raw.reshape(-1, 3)
+            samples = widened.view('<i4')[:, 0] >> 8
+        else:
+            samples = raw.view('<' + self._typecode())
+        return samples.reshape(frames, self.channels)
+
+    def _typecode(self):
+        try:
+            return self.TYPECODES[self.formattag, self.samplebits]
+        except KeyError:
+            raise Error('unsupported sample format {}/{}'.format(
+                self.formattag, self.samplebits
+            )) from None
+
+    def _widen24(self, view):
+        widened = bytearray(len(view) // 3 * 4)
+        widened[0::4] = view[0::3].tobytes()
+        widened[1::4] = view[1::3].tobytes()
+        widened[2::4] = view[2::3].tobytes()
+        widened[3::4] = view[2::3].tobytes().translate(self.SIGN_EXTENSION)
+        return memoryview(widened)
+
+    @property
+    def blockalign(self):
+        return self.channels * ((self.samplebits + 7) // 8)
+
+    @property
+    def byterate(self):
+        return self.samplerate * self.blockalign
+
+    @property
+    def channels(self):
+        return self._channels
+
+    def decode(self, buffer):
+        view = memoryview(buffer).cast('B')
+        frames = len(view) // self.blockalign
+        view = view[:frames * self.blockalign]
+        if numpy is not None:
+            return self._decodearray(view, frames)
+        if (self.formattag, self.samplebits) == (self.WAVE_FORMAT_PCM, 24):
+            typecode = 'i'
+            view = self._widen24(view)
+        else:
+            typecode = self._typecode()
+            if sys.byteorder != 'little':
+                samples = array.array(typecode, view.tobytes())
+                samples.byteswap()
+                view = memoryview(samples).cast('B')
+        if frames == 0:
+            return view.cast(typecode)
+        return view.cast(typecode, (frames, self.channels))
+
+    @property
+    def formattag(self):
+        return self._formattag
+
+    def fromfloat(self, samples, dither=False, rng=None):
+        _requirenumpy()
+        samples = numpy.asarray(samples, dtype=numpy.float64)
+        if samples.ndim == 1:
+            samples = samples.reshape(-1, 1)
+        if samples.shape[1] != self.channels:
+            raise Error('expected {} channels, got {}'.format(
+                self.channels, samples.shape[1]
+            ))
+        self._checkencodable()
+        if self.formattag == self.WAVE_FORMAT_IEEE_FLOAT:
+            dtype = '<f{}'.format(self.samplebits // 8)
+            return samples.astype(dtype).tobytes()
+        fullscale = float(1 << (self.samplebits - 1))
+        samples = samples * fullscale
+        if dither:
+            rng = numpy.random.default_rng() if rng is None else rng
+            samples += rng.random(samples.shape) - rng.random(samples.shape)
+        samples = numpy.clip(numpy.rint(samples), -fullscale, fullscale - 1)
+        if self.samplebits == 8:
+            return (samples + fullscale).astype('u1').tobytes()
+        if self.samplebits == 24:
+            widened = samples.astype('<i4').view('u1').reshape(-1, 4)
+            return widened[:, :3].tobytes()
+        return samples.astype('<i{}'.format(self.samplebits // 8)).tobytes()
+
+    @property
+    def samplebits(self):
+        return self._samplebits
+
+    @property
+    def samplerate(self):
+        return self._samplerate
+
+    def tofloat(self, buffer, dtype=None):
+        _requirenumpy()
+        dtype = self._floattype() if dtype is None else dtype
+        samples = numpy.asarray(self.decode(buffer)).reshape(-1, self.channels)
+        if self.formattag == self.WAVE_FORMAT_IEEE_FLOAT:
+            return samples.astype(dtype)
+        fullscale = float(1 << (self.samplebits - 1))
+        if self.samplebits == 8:
+            samples = samples.astype(dtype) - fullscale
+        return (samples / fullscale).astype(dtype)
+
+    def writeto(self, iostream):
+        buffer = self.FORMAT_STRUCT.pack(
+            self.formattag, self.channels, self.samplerate, self.byterate,
+            self.blockalign, self.samplebits
+        )
+        ChunkHeader(self.ID, len(buffer)).writeto(iostream)
+        iostream.write(buffer)
+
+
+class WaveStats:
+    FORMAT = 'WSTS'
+    OVERVIEW_ID = 'ovrv'
+    OVERVIEW_STRUCT = struct.Struct('<I')
+    STATS_ID = 'stat'
+    STATS_STRUCT = struct.Struct('<HQ')
+
+    def __init__(self, frames, peak, rms, dcoffset, clipped, overviews=None):
+        self._frames = frames
+        self._peak = peak
+        self._rms = rms
+        self._dcoffset = dcoffset
+        self._clipped = clipped
+        self._overviews = dict(overviews or {})
+
+    @classmethod
+    def readfrom(cls, iostream):
+        _requirenumpy()
+        riffchunk = RiffChunk.readfrom(iostream)
+        if riffchunk.format != cls.FORMAT:
+            raise Error("'{}' != '{}'".format(riffchunk.format, cls.FORMAT))
+        stats, buffers = None, []
+        for subchunk in riffchunk.subchunks():
+            buffer = subchunk.data.read()
+            if subchunk.id == cls.OVERVIEW_ID:
+                buffers.append(buffer)
+            elif subchunk.id == cls.STATS_ID and stats is None:
+                channels, frames = cls.STATS_STRUCT.unpack_from(buffer)
+                values = numpy.frombuffer(
+                    buffer, '<f8', 3 * channels, cls.STATS_STRUCT.size
+                ).reshape(3, channels)
+                clipped = numpy.frombuffer(
+                    buffer, '<u8', channels,
+                    cls.STATS_STRUCT.size + values.nbytes
+                )
+                stats = (frames,) + tuple(values) + (clipped,)
+        if stats is None:
+            raise Error('no stats subchunk found')
+        overviews = {}
+        for buffer in buffers:
+            binsize, = cls.OVERVIEW_STRUCT.unpack_from(buffer)
+            extremes = numpy.frombuffer(
+                buffer, '<f4', offset=cls.OVERVIEW_STRUCT.size
+            )
+            overviews[binsize] = tuple(extremes.reshape(2, -1, channels))
+        return cls(*stats, overviews=overviews)
+
+    def __repr__(self):
+        return 'riff.WaveStats(frames={}, channels={})'.format(
+            self.frames, self.channels
+        )
+
+    @property
+    def binsizes(self):
+        return sorted(self._overviews)
+
+    @property
+    def channels(self):
+        return len(self._peak)
+
+    @property
+    def clipped(self):
+        return self._clipped
+
+    @property
+    def dcoffset(self):
+        return self._dcoffset
+
+    @property
+    def frames(self):
+        return self._frames
+
+    def overview(self, binsize):
+        try:
+            return self._overviews[binsize]
+        except KeyError:
+            raise Error(
+                'no overview with {} frames per bin'.format(binsize)
+            ) from None
+
+    @property
+    def peak(self):
+        return self._peak
+
+    @property
+    def rms(self):
+        return self._rms
+
+    def writeto(self, iostream):
+        with RiffWriter(iostream, self.FORMAT, reserve=False) as writer:
+            with writer.subchunk(self.STATS_ID) as statswriter:
+                statswriter.write(
+                    self.STATS_STRUCT.pack(self.channels, self.frames)
+                )
+                values = (self.peak, self.rms, self.dcoffset)
+                statswriter.write(numpy.asarray(values, '<f8').tobytes())
+                statswriter.write(numpy.asarray(self.clipped, '<u8').tobytes())
+            for binsize in self.binsizes:
+                with writer.subchunk(self.OVERVIEW_ID) as overviewwriter:
+                    overviewwriter.write(self.OVERVIEW_STRUCT.pack(binsize))
+                    extremes = numpy.asarray(self.overview(binsize), '<f4')
+                    overviewwriter.write(extremes.tobytes())
+        return writer.size
+
+
+class WaveChunk:
+    DATA_ID = 'data'
+    FORMAT = 'WAVE'
+    ID = RiffChunk.ID
+    STATS_BLOCK_SIZE = 64 * 1024
+    TRANSCODE_BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, size, formatchunk, datachunk):
+        self._size = size
+        self._formatchunk = formatchunk
+        self._datachunk = datachunk
+
+    @classmethod
+    def _fromriffchunk(cls, riffchunk):
+        if riffchunk.format != cls.FORMAT:
+            raise Error("'{}' != '{}'".format(riffchunk.format, cls.FORMAT))
+        formatchunk = datachunk = None
+        for subchunk in riffchunk.subchunks():
+            if subchunk.id == WaveFormatChunk.ID and formatchunk is None:
+                formatchunk = WaveFormatChunk.fromchunk(subchunk)
+            elif subchunk.id == cls.DATA_ID and datachunk is None:
+                datachunk = subchunk
+            if formatchunk is not None and datachunk is not None:
+                break
+        if formatchunk is None:
+            raise Error('no wave format subchunk found')
+        if datachunk is None:
+            raise Error('no wave data subchunk found')
+        return cls(riffchunk.size, formatchunk, datachunk)
+
+    @classmethod
+    def mapfrom(cls, path):
+        return cls._fromriffchunk(RiffChunk.mapfrom(path, lazy=True))
+
+    @classmethod
+    def readfrom(cls, iostream):
+        return cls._fromriffchunk(RiffChunk.readfrom(iostream, lazy=True))
+
+    @classmethod
+    def streamfrom(cls, iostream, buffersize=0, hashes=None):
+        riffchunk = RiffChunk.streamfrom(
+            iostream, lazy=True, buffersize=buffersize, hashes=hashes
+        )
+        return cls._fromriffchunk(riffchunk)
+
+    @classmethod
+    def unpackfrom(cls, buffer, offset=0):
+        riffchunk = RiffChunk.unpackfrom(buffer, offset, lazy=True)
+        return cls._fromriffchunk(riffchunk)
+
+    def __repr__(self):
+        return 'riff.WaveChunk(size={}, frames={})'.format(
+            self.size, self.frames
+        )
+
+    def _blockstats(self, start, stop, binsizes, cliplevel):
+        buffer = self._readframebytes(start, stop - start)
+        samples = self.formatchunk.tofloat(buffer)
+        channels = numpy.ascontiguousarray(samples.T)
+        clipped = numpy.count_nonzero(channels >= cliplevel, axis=1)
+        clipped += numpy.count_nonzero(channels <= -1.0, axis=1)
+        overviews = []
+        for binsize in binsizes:
+            indices = numpy.arange(start - start % binsize, stop, binsize)
+            indices -= start
+            indices[0] = 0
+            overviews.append((
+                numpy.minimum.reduceat(channels, indices, axis=1).T,
+                numpy.maximum.reduceat(channels, indices, axis=1).T,
+            ))
+        squares = numpy.einsum(
+            'ij,ij->i', channels, channels, dtype=numpy.float64
+        )
+        peak = numpy.maximum(channels.max(axis=1), -channels.min(axis=1))
+        return (
+            channels.sum(axis=1, dtype=numpy.float64), squares, peak, clipped,
+            overviews
+        )
+
+    def _readframebytes(self, start, count):
+        data = self.datachunk.data
+        blockalign = self.formatchunk.blockalign
+        try:
+            buffer = data.getbuffer()
+        except io.UnsupportedOperation:
+            buffer = bytearray(count * blockalign)
+            data.readintoat(start * blockalign, buffer)
+            return buffer
+        return buffer[start * blockalign:(start + count) * blockalign]
+
+    def _transcodeblocks(self, formatchunk, channels, mix, blocksize,
+                         dither, rng):
+        dtype = numpy.result_type(
+            self.formatchunk._floattype(), formatchunk._floattype()
+        )
+        for samples in self.iterfloat(blocksize, dtype=dtype):
+            if channels is not None:
+                samples = samples[:, list(channels)]
+            if mix is not None:
+                samples = samples @ mix
+            yield formatchunk.fromfloat(samples, dither, rng)
+
+    @property
+    def datachunk(self):
+        return self._datachunk
+
+    @property
+    def formatchunk(self):
+        return self._formatchunk
+
+    @property
+    def frames(self):
+        return self.datachunk.size // self.formatchunk.blockalign
+
+    @property
+    def id(self):
+        return self.ID
+
+    def iterfloat(self, blocksize, start=0, stop=None, dtype=None):
+        for buffer in self.iterframes(blocksize, start, stop):
+            yield self.formatchunk.tofloat(buffer, dtype)
+
+    def iterframes(self, blocksize, start=0, stop=None):
+        if blocksize < 1:
+            raise ValueError('block size must be positive')
+        start, stop, _ = slice(start, stop).indices(self.frames)
+        data = self.datachunk.data
+        blockalign = self.formatchunk.blockalign
+        while start < stop:
+            count = min(blocksize, stop - start)
+            yield data.readat(start * blockalign, count * blockalign)
+            start += count
+
+    def itertranscode(self, formatchunk, channels=None, mix=None,
+                      blocksize=TRANSCODE_BLOCK_SIZE, dither=True, rng=None):
+        _requirenumpy()
+        if formatchunk.samplerate != self.formatchunk.samplerate:
+            raise Error('sample rate conversion not supported')
+        formatchunk._checkencodable()
+        outchannels = self.formatchunk.channels
+        if channels is not None:
+            channels = list(channels)
+            for channel in channels:
+                if not -outchannels <= channel < outchannels:
+                    raise Error('channel {} out of range'.format(channel))
+            outchannels = len(channels)
+        if mix is not None:
+            mix = numpy.asarray(mix, dtype=numpy.float64).T
+            if mix.ndim != 2 or mix.shape[0] != outchannels:
+                raise Error('mix expects {} input channels'.format(
+                    outchannels
+                ))
+            outchannels = mix.shape[1]
+        if outchannels != formatchunk.channels:
+            raise Error('expected {} channels, got {}'.format(
+                formatchunk.channels, outchannels
+            ))
+        pcm = WaveFormatChunk.WAVE_FORMAT_PCM
+        narrowing = self.formatchunk.formattag != pcm
+        if not narrowing:
+            narrowing = self.formatchunk.samplebits > formatchunk.samplebits
+        dither = dither and formatchunk.formattag == pcm and narrowing
+        if dither and rng is None:
+            rng = numpy.random.default_rng()
+        return self._transcodeblocks(
+            formatchunk, channels, mix, blocksize, dither, rng
+        )
+
+    def readframes(self, start, count):
+        start = self.seekframe(start)
+        count = max(0, min(count, self.frames - start))
+        return self.datachunk.data.read(count * self.formatchunk.blockalign)
+
+    def readsamples(self, start=0, stop=None):
+        start, stop, _ = slice(start, stop).indices(self.frames)
+        buffer = self._readframebytes(start, max(0, stop - start))
+        return self.formatchunk.decode(buffer)
+
+    def seekframe(self, frame, whence=io.SEEK_SET):
+        blockalign = self.formatchunk.blockalign
+        if whence == io.SEEK_SET:
+            frame = max(0, min(frame, self.frames))
+        elif whence == io.SEEK_CUR:
+            frame = max(0, min(self.tellframe() + frame, self.frames))
+        elif whence == io.SEEK_END:
+            frame = max(0, min(self.frames + frame, self.frames))
+        else:
+            raise ValueError('invalid whence value')
+        self.datachunk.data.seek(frame * blockalign, io.SEEK_SET)
+        return frame
+
+    @property
+    def size(self):
+        return self._size
+
+    def stats(self, binsizes=(), blocksize=STATS_BLOCK_SIZE, workers=1):
+        _requirenumpy()
+        if blocksize < 1:
+            raise ValueError('block size must be positive')
+        binsizes = sorted(set(binsizes))
+        if any(binsize < 1 for binsize in binsizes):
+            raise ValueError('bin size must be positive')
+        formatchunk = self.formatchunk
+        cliplevel = 1.0
+        if formatchunk.formattag == WaveFormatChunk.WAVE_FORMAT_PCM:
+            cliplevel -= 1.0 / (1 << (formatchunk.samplebits - 1))
+        starts = range(0, self.frames, blocksize)
+        stops = [min(start + blocksize, self.frames) for start in starts]
+        arguments = (
+            starts, stops, [binsizes] * len(starts), [cliplevel] * len(starts)
+        )
+        if workers == 1:
+            partials = map(self._blockstats, *arguments)
+        else:
+            with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+                partials = list(executor.map(self._blockstats, *arguments))
+        channels = formatchunk.channels
+        sums = numpy.zeros(channels)
+        squares = numpy.zeros(channels)
+        peak = numpy.zeros(channels)
+        clipped = numpy.zeros(channels, numpy.uint64)
+        extremes = [([], []) for binsize in binsizes]
+        for start, partial in zip(starts, partials):
+            sums += partial[0]
+            squares += partial[1]
+            numpy.maximum(peak, partial[2], out=peak)
+            clipped += partial[3].astype(numpy.uint64)
+            for binsize, (mins, maxs), (blockmins, blockmaxs) in zip(
+                    binsizes, extremes, partial[4]):
+                if start % binsize != 0:
+                    numpy.minimum(mins[-1][-1], blockmins[0], out=mins[-1][-1])
+                    numpy.maximum(maxs[-1][-1], blockmaxs[0], out=maxs[-1][-1])
+                    blockmins, blockmaxs = blockmins[1:], blockmaxs[1:]
+                if len(blockmins) > 0:
+                    mins.append(blockmins)
+                    maxs.append(blockmaxs)
+        frames = max(self.frames, 1)
+        overviews = {}
+        for binsize, (mins, maxs) in zip(binsizes, extremes):
+            empty = numpy.zeros((0, channels), numpy.float32)
+            overviews[binsize] = (
+                numpy.concatenate(mins) if mins else empty,
+                numpy.concatenate(maxs) if maxs else empty,
+            )
+        return WaveStats(
+            self.frames, peak, numpy.sqrt(squares / frames), sums / frames,
+            clipped, overviews
+        )
+
+    def tellframe(self):
+        return self.datachunk.data.tell() // self.formatchunk.blockalign
+
+    def transcodeto(self, iostream, formatchunk, channels=None, mix=None,
+                    blocksize=TRANSCODE_BLOCK_SIZE, dither=True, rng=None):
+        blocks = self.itertranscode(
+            formatchunk, channels, mix, blocksize, dither, rng
+        )
+        writer = RiffWriter(iostream, self.FORMAT)
+        writer.writechunk(formatchunk)
+        datawriter = writer.subchunk(self.DATA_ID)
+        for buffer in blocks:
+            datawriter.write(buffer)
+        datawriter.close()
+        writer.close()
+        return writer.size
+
+
+def _scanformat(iostream, position):
+    resumepos = iostream.tell()
+    iostream.seek(position, io.SEEK_SET)
+    formatchunk = WaveFormatChunk.fromchunk(Chunk.readfrom(iostream))
+    iostream.seek(resumepos, io.SEEK_SET)
+    return formatchunk
+
+
+def _scanpath(path):
+    format = formatchunk = None
+    subchunks = []
+    try:
+        with open(path, 'rb') as iostream:
+            header = ChunkHeader.readfrom(iostream)
+            if header.id in RiffChunk.LARGE_IDS:
+                iostream.seek(0, io.SEEK_SET)
+                riffchunk = RiffChunk.streamfrom(iostream, lazy=True)
+                format = riffchunk.format
+                wantformat = format == WaveChunk.FORMAT
+                for subchunk in riffchunk.subchunks():
+                    subchunks.append((subchunk.id, subchunk.size))
+                    if wantformat and subchunk.id == WaveFormatChunk.ID:
+                        formatchunk = WaveFormatChunk.fromchunk(subchunk)
+                        wantformat = False
+            else:
+                RiffChunk._checkid(header)
+                format = RiffChunk._unpackformat(
+                    iostream.read(RiffChunk.FORMAT_STRUCT.size)
+                )
+                end = ChunkHeader.HEADER_STRUCT.size + header.size
+                wantformat = format == WaveChunk.FORMAT
+                headers = ChunkHeader.iterfrom(iostream, end)
+                for position, id, size in headers:
+                    subchunks.append((id, size))
+                    if wantformat and id == WaveFormatChunk.ID:
+                        formatchunk = _scanformat(iostream, position)
+                        wantformat = False
+    except Exception as error:
+        return ScanResult(path, format, subchunks, formatchunk, error)
+    return ScanResult(path, format, subchunks, formatchunk)
+
+
+def addhook(hook):
+    _hooks.append(hook)
+
+
+def removehook(hook):
+    _hooks.remove(hook)
+
+
+def scan(paths, workers=None, processes=False):
+    if processes:
+        executortype = concurrent.futures.ProcessPoolExecutor
+        workers = workers or os.cpu_count() or 1
+    else:
+        executortype = concurrent.futures.ThreadPoolExecutor
+        workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    with executortype(workers) as executor:
+        pending = set()
+        for path in paths:
+            if len(pending) >= 2 * workers:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(_scanpath, path))
+        for future in concurrent.futures.as_completed(pending):
+            yield future.result()
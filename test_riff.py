@@ -1,6 +1,134 @@
+import array
+import asyncio
+import concurrent.futures
+import gzip
+import hashlib
 import io
+import os
 import riff
+import struct
+import tempfile
+import time
 import unittest.mock
+import zlib
+
+
+def wavebytes(channels, samplebits, data, formattag=1, samplerate=8000):
+    blockalign = channels * samplebits // 8
+    fmt = struct.pack(
+        '<HHIIHH', formattag, channels, samplerate,
+        samplerate * blockalign, blockalign, samplebits
+    )
+    body = b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+    body += b'data' + struct.pack('<I', len(data)) + data
+    body += b'\x00' if len(data) % 2 else b''
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def runasync(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def streamreader(contents):
+    reader = asyncio.StreamReader()
+    reader.feed_data(contents)
+    reader.feed_eof()
+    return reader
+
+
+class NonSeekableBytesIO(io.BytesIO):
+    def seek(self, *args):
+        raise io.UnsupportedOperation('seek')
+
+    def seekable(self):
+        return False
+
+    def tell(self):
+        raise io.UnsupportedOperation('tell')
+
+
+class TempFileTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tempdir.cleanup)
+
+    def tempfile(self, contents):
+        path = os.path.join(self._tempdir.name, 'mock.riff')
+        with open(path, 'wb') as iostream:
+            iostream.write(contents)
+        return path
+
+
+class Test_ChunkHeader_iterfrom(unittest.TestCase):
+    EXPECTED = [(12, 'CNKA', 3), (24, 'LIST', 26), (58, 'CNKB', 4)]
+
+    def headers(self, iostream, **kwargs):
+        return list(riff.ChunkHeader.iterfrom(iostream, **kwargs))
+
+    def test_yields_sibling_headers(self):
+        iostream = io.BytesIO(NESTED_RIFF)
+        iostream.seek(12)
+        self.assertEqual(self.EXPECTED, self.headers(iostream))
+
+    def test_yields_headers_with_small_blocks(self):
+        iostream = io.BytesIO(NESTED_RIFF)
+        iostream.seek(12)
+        self.assertEqual(self.EXPECTED, self.headers(iostream, blocksize=5))
+
+    def test_yields_headers_from_non_seekable_stream(self):
+        iostream = NonSeekableBytesIO(NESTED_RIFF)
+        iostream.read(12)
+        headers = self.headers(iostream, blocksize=5)
+        expected = [
+            (position - 12, id, size) for position, id, size in self.EXPECTED
+        ]
+        self.assertEqual(expected, headers)
+
+    def test_stops_at_end(self):
+        iostream = io.BytesIO(NESTED_RIFF)
+        iostream.seek(12)
+        self.assertEqual(self.EXPECTED[:2], self.headers(iostream, end=58))
+
+    def test_error_when_header_truncated(self):
+        iostream = io.BytesIO(NESTED_RIFF[:62])
+        iostream.seek(12)
+        with self.assertRaises(riff.Error) as ctx:
+            self.headers(iostream)
+        self.assertEqual('chunk header truncated', str(ctx.exception))
+
+    def test_error_when_data_truncated(self):
+        buffer = b'CNKA\x04\x00\x00\x00AAAACNKB\x10\x00\x00\x00BB'
+        for iostream in (io.BytesIO(buffer), NonSeekableBytesIO(buffer)):
+            headers = riff.ChunkHeader.iterfrom(iostream, blocksize=4)
+            self.assertEqual((0, 'CNKA', 4), next(headers))
+            self.assertEqual((12, 'CNKB', 16), next(headers))
+            with self.assertRaises(riff.Error) as ctx:
+                next(headers)
+            self.assertEqual('chunk data truncated', str(ctx.exception))
+
+    def test_error_when_data_overruns_end(self):
+        iostream = io.BytesIO(NESTED_RIFF)
+        iostream.seek(12)
+        with self.assertRaises(riff.Error) as ctx:
+            self.headers(iostream, end=56)
+        self.assertEqual('chunk data truncated', str(ctx.exception))
+
+    def test_error_when_last_data_truncated_before_end(self):
+        for iostream, end in (
+                (io.BytesIO(NESTED_RIFF[:66]), 70),
+                (NonSeekableBytesIO(NESTED_RIFF[:66]), 58)):
+            iostream.read(12)
+            with self.assertRaises(riff.Error) as ctx:
+                self.headers(iostream, end=end)
+            self.assertEqual('chunk data truncated', str(ctx.exception))
+
+    def test_no_error_when_final_pad_byte_missing(self):
+        iostream = io.BytesIO(b'CNKA\x03\x00\x00\x00AAA')
+        self.assertEqual([(0, 'CNKA', 3)], self.headers(iostream))
 
 
 class Test_Chunk_create(unittest.TestCase):
@@ -14,6 +142,13 @@ class Test_Chunk_create(unittest.TestCase):
         riff.Chunk.create('MOCK', 0, datastream)
 
 
+class Test_Chunk_slots(unittest.TestCase):
+    def test_has_no_instance_dict(self):
+        chunk = riff.Chunk.create('MOCK', 0, io.BytesIO(b''))
+        self.assertFalse(hasattr(chunk, '__dict__'))
+        self.assertFalse(hasattr(chunk._header, '__dict__'))
+
+
 class Test_Chunk_data(unittest.TestCase):
     def test_is_ChunkData_instance_after_creating_chunk(self):
         datastream = io.BytesIO(b'MockData')
@@ -26,6 +161,28 @@ class Test_Chunk_data(unittest.TestCase):
         self.assertIsInstance(chunk.data, riff.ChunkData)
 
 
+class Test_Chunk_writeto(unittest.TestCase):
+    def test_writes_streamed_chunk(self):
+        iostream = io.BytesIO(b'MOCK\x03\x00\x00\x00Odd\x00')
+        chunk = riff.Chunk.streamfrom(iostream)
+        output = io.BytesIO()
+        chunk.writeto(output)
+        self.assertEqual(b'MOCK\x03\x00\x00\x00Odd\x00', output.getvalue())
+
+    def test_writes_created_chunk(self):
+        chunk = riff.Chunk.create('MOCK', 8, io.BytesIO(b'MockData'))
+        output = io.BytesIO()
+        chunk.writeto(output)
+        self.assertEqual(b'MOCK\x08\x00\x00\x00MockData', output.getvalue())
+
+    def test_writes_whole_data_after_partial_read(self):
+        chunk = riff.Chunk.unpackfrom(b'MOCK\x04\x00\x00\x00Data')
+        chunk.data.read(2)
+        output = io.BytesIO()
+        chunk.writeto(output)
+        self.assertEqual(b'MOCK\x04\x00\x00\x00Data', output.getvalue())
+
+
 class Test_Chunk_id(unittest.TestCase):
     def test_value_after_creating_chunk(self):
         datastream = io.BytesIO(b'MockData')
@@ -38,6 +195,36 @@ class Test_Chunk_id(unittest.TestCase):
         self.assertEqual('MOCK', chunk.id)
 
 
+class Test_Chunk_mapfrom(TempFileTestCase):
+    def test_returns_Chunk_instance(self):
+        path = self.tempfile(b'MOCK\x08\x00\x00\x00MockData')
+        chunk = riff.Chunk.mapfrom(path)
+        self.assertIsInstance(chunk, riff.Chunk)
+
+    def test_reads_header(self):
+        path = self.tempfile(b'MOCK\x0b\x00\x00\x00MockDataOdd\x00')
+        chunk = riff.Chunk.mapfrom(path)
+        self.assertEqual('MOCK', chunk.id)
+        self.assertEqual(11, chunk.size)
+
+    def test_can_read_data(self):
+        path = self.tempfile(b'MOCK\x08\x00\x00\x00MockData')
+        chunk = riff.Chunk.mapfrom(path)
+        self.assertEqual(b'MockData', chunk.data.read())
+
+    def test_error_when_file_empty(self):
+        path = self.tempfile(b'')
+        with self.assertRaises(riff.Error) as ctx:
+            riff.Chunk.mapfrom(path)
+        self.assertEqual('chunk header truncated', str(ctx.exception))
+
+    def test_error_when_data_truncated(self):
+        path = self.tempfile(b'MOCK\x08\x00\x00\x00Mock')
+        with self.assertRaises(riff.Error) as ctx:
+            riff.Chunk.mapfrom(path)
+        self.assertEqual('chunk data truncated', str(ctx.exception))
+
+
 class Test_Chunk_padded(unittest.TestCase):
     def test_True_if_size_odd_and_pad_byte_expected(self):
         iostream = io.BytesIO(b'MOCK\x0b\x00\x00\x00MockDataOdd\x00')
@@ -98,6 +285,11 @@ class Test_Chunk_readfrom(unittest.TestCase):
             riff.Chunk.readfrom(iostream)
         self.assertEqual('chunk id not ascii-decodable', str(ctx.exception))
 
+    def test_consumes_pad_byte(self):
+        iostream = io.BytesIO(b'MOCK\x03\x00\x00\x00Odd\x00Next')
+        riff.Chunk.readfrom(iostream)
+        self.assertEqual(b'Next', iostream.read())
+
     def test_can_read_data_after_closing_iostream(self):
         iostream = io.BytesIO(b'MOCK\x08\x00\x00\x00MockData')
         chunk = riff.Chunk.readfrom(iostream)
@@ -105,6 +297,34 @@ class Test_Chunk_readfrom(unittest.TestCase):
         self.assertEqual(b'Mock', chunk.data.read(4))
 
 
+class Test_Chunk_unpackfrom(unittest.TestCase):
+    def test_returns_Chunk_instance(self):
+        chunk = riff.Chunk.unpackfrom(b'MOCK\x08\x00\x00\x00MockData')
+        self.assertIsInstance(chunk, riff.Chunk)
+
+    def test_unpacks_from_offset(self):
+        buffer = b'SomeMOCK\x04\x00\x00\x00Data'
+        chunk = riff.Chunk.unpackfrom(buffer, offset=4)
+        self.assertEqual('MOCK', chunk.id)
+        self.assertEqual(b'Data', chunk.data.read())
+
+    def test_data_is_view_of_buffer(self):
+        buffer = bytearray(b'MOCK\x04\x00\x00\x00Data')
+        chunk = riff.Chunk.unpackfrom(buffer)
+        buffer[8:12] = b'Test'
+        self.assertEqual(b'Test', chunk.data.read())
+
+    def test_error_when_header_truncated(self):
+        with self.assertRaises(riff.Error) as ctx:
+            riff.Chunk.unpackfrom(b'MOCK\x08\x00')
+        self.assertEqual('chunk header truncated', str(ctx.exception))
+
+    def test_error_when_data_truncated(self):
+        with self.assertRaises(riff.Error) as ctx:
+            riff.Chunk.unpackfrom(b'MOCK\x08\x00\x00\x00Mock')
+        self.assertEqual('chunk data truncated', str(ctx.exception))
+
+
 class Test_Chunk_repr(unittest.TestCase):
     def test_for_unpadded_chunk_read_from_stream(self):
         iostream = io.BytesIO(b'MOCK\x08\x00\x00\x00MockData')
@@ -149,7 +369,356 @@ class Test_Chunk_size(unittest.TestCase):
         self.assertEqual(11, chunk.size)
 
 
-class Test_ChunkData_read(unittest.TestCase):
+NESTED_RIFF = (
+    b'RIFF\x3e\x00\x00\x00MOCK'
+    b'CNKA\x03\x00\x00\x00AAA\x00'
+    b'LIST\x1a\x00\x00\x00INFO'
+    b'INAM\x04\x00\x00\x00Name'
+    b'ICMT\x02\x00\x00\x00Hi'
+    b'CNKB\x04\x00\x00\x00BBBB'
+)
+
+
+class Test_ChunkIndex_buildfrom(unittest.TestCase):
+    def test_indexes_nested_chunks(self):
+        index = riff.ChunkIndex.buildfrom(io.BytesIO(NESTED_RIFF))
+        entries = [
+            (entry.id, entry.level, entry.headerpos, entry.size)
+            for entry in index.entries()
+        ]
+        self.assertEqual([
+            ('RIFF', 0, 0, 62),
+            ('CNKA', 1, 12, 3),
+            ('LIST', 1, 24, 26),
+            ('INAM', 2, 36, 4),
+            ('ICMT', 2, 48, 2),
+            ('CNKB', 1, 58, 4),
+        ], entries)
+
+    def test_records_list_types(self):
+        index = riff.ChunkIndex.buildfrom(io.BytesIO(NESTED_RIFF))
+        listtypes = [entry.listtype for entry in index.entries()]
+        self.assertEqual(['MOCK', None, 'INFO', None, None, None], listtypes)
+
+    def test_entry_data_position_and_padding(self):
+        index = riff.ChunkIndex.buildfrom(io.BytesIO(NESTED_RIFF))
+        entry = index.find('CNKA')
+        self.assertEqual(20, entry.datapos)
+        self.assertTrue(entry.padded)
+
+    def test_resolves_rf64_sizes(self):
+        index = riff.ChunkIndex.buildfrom(io.BytesIO(RF64_WAVE))
+        entries = [
+            (entry.id, entry.level, entry.size, entry.listtype)
+            for entry in index.entries()
+        ]
+        self.assertEqual([
+            ('RF64', 0, 98, 'WAVE'),
+            ('ds64', 1, 40, None),
+            ('fmt ', 1, 16, None),
+            ('BIGC', 1, 2, None),
+            ('data', 1, 4, None),
+        ], entries)
+
+    def test_error_when_rf64_ds64_missing(self):
+        iostream = io.BytesIO(b'RF64\xff\xff\xff\xffWAVEJUNK' + bytes(20))
+        with self.assertRaises(riff.Error) as ctx:
+            riff.ChunkIndex.buildfrom(iostream)
+        self.assertEqual('no ds64 chunk found', str(ctx.exception))
+
+    def test_error_when_header_truncated(self):
+        iostream = io.BytesIO(b'RIFF\x04\x00\x00\x00MOCKCNK')
+        with self.assertRaises(riff.Error) as ctx:
+            riff.ChunkIndex.buildfrom(iostream)
+        self.assertEqual('chunk header truncated', str(ctx.exception))
+
+
+class Test_ChunkIndex_find(unittest.TestCase):
+    def test_returns_first_matching_entry(self):
+        index = riff.ChunkIndex.buildfrom(io.BytesIO(NESTED_RIFF))
+        self.assertEqual(36, index.find('INAM').headerpos)
+
+    def test_returns_None_when_not_found(self):
+        index = riff.ChunkIndex.buildfrom(io.BytesIO(NESTED_RIFF))
+        self.assertIsNone(index.find('NONE'))
+
+    def test_ignores_matches_spanning_entries(self):
+        index = riff.ChunkIndex.buildfrom(io.BytesIO(NESTED_RIFF))
+        self.assertIsNone(index.find('KALI'))
+
+    def test_returns_None_for_non_ascii_id(self):
+        index = riff.ChunkIndex.buildfrom(io.BytesIO(NESTED_RIFF))
+        self.assertIsNone(index.find('N\xe4me'))
+
+
+class Test_ChunkIndex_findall(unittest.TestCase):
+    def test_returns_all_matching_entries(self):
+        index = riff.ChunkIndex.buildfrom(io.BytesIO(NESTED_RIFF))
+        entries = list(index.findall('LIST'))
+        self.assertEqual([24], [entry.headerpos for entry in entries])
+        self.assertEqual('INFO', entries[0].listtype)
+
+
+class Test_ChunkIndex_findpath(unittest.TestCase):
+    def test_finds_nested_entry(self):
+        index = riff.ChunkIndex.buildfrom(io.BytesIO(NESTED_RIFF))
+        self.assertEqual(48, index.findpath('LIST/INFO/ICMT').headerpos)
+
+    def test_finds_list_entry(self):
+        index = riff.ChunkIndex.buildfrom(io.BytesIO(NESTED_RIFF))
+        self.assertEqual(24, index.findpath('LIST/INFO').headerpos)
+
+    def test_ignores_nested_entries_for_top_level_id(self):
+        index = riff.ChunkIndex.buildfrom(io.BytesIO(NESTED_RIFF))
+        self.assertIsNone(index.findpath('INAM'))
+
+    def test_returns_None_for_wrong_list_type(self):
+        index = riff.ChunkIndex.buildfrom(io.BytesIO(NESTED_RIFF))
+        self.assertIsNone(index.findpath('LIST/movi/INAM'))
+
+
+class Test_ChunkIndex_loadfor(TempFileTestCase):
+    def test_writes_sidecar(self):
+        path = self.tempfile(NESTED_RIFF)
+        riff.ChunkIndex.loadfor(path)
+        self.assertTrue(os.path.exists(path + riff.ChunkIndex.SIDECAR_SUFFIX))
+
+    def test_reuses_valid_sidecar(self):
+        path = self.tempfile(NESTED_RIFF)
+        riff.ChunkIndex.loadfor(path)
+        with unittest.mock.patch.object(riff.ChunkIndex, 'buildfrom') as mock:
+            index = riff.ChunkIndex.loadfor(path)
+        mock.assert_not_called()
+        self.assertEqual(6, len(index))
+
+    def test_rebuilds_when_file_modified(self):
+        path = self.tempfile(NESTED_RIFF)
+        riff.ChunkIndex.loadfor(path)
+        self.tempfile(b'RIFF\x04\x00\x00\x00MOCK')
+        os.utime(path, ns=(0, 0))
+        index = riff.ChunkIndex.loadfor(path)
+        self.assertEqual(1, len(index))
+
+    def test_rebuilds_when_sidecar_corrupt(self):
+        path = self.tempfile(NESTED_RIFF)
+        with open(path + riff.ChunkIndex.SIDECAR_SUFFIX, 'wb') as iostream:
+            iostream.write(b'JUNK')
+        index = riff.ChunkIndex.loadfor(path)
+        self.assertEqual(6, len(index))
+
+
+class Test_ChunkIndex_readfrom(unittest.TestCase):
+    def test_round_trips_written_index(self):
+        index = riff.ChunkIndex.buildfrom(
+            io.BytesIO(NESTED_RIFF), filesize=70, mtime=123
+        )
+        iostream = io.BytesIO()
+        index.writeto(iostream)
+        iostream.seek(0)
+        loaded = riff.ChunkIndex.readfrom(iostream)
+        self.assertEqual(70, loaded.filesize)
+        self.assertEqual(123, loaded.mtime)
+        self.assertEqual(
+            [(e.id, e.level, e.headerpos, e.size, e.listtype)
+             for e in index.entries()],
+            [(e.id, e.level, e.headerpos, e.size, e.listtype)
+             for e in loaded.entries()]
+        )
+
+    def test_error_for_unrecognised_index(self):
+        iostream = io.BytesIO(b'MOCK' + bytes(22))
+        with self.assertRaises(riff.Error) as ctx:
+            riff.ChunkIndex.readfrom(iostream)
+        self.assertEqual('chunk index not recognised', str(ctx.exception))
+
+    def test_error_when_truncated(self):
+        iostream = io.BytesIO(b'RIDX')
+        with self.assertRaises(riff.Error) as ctx:
+            riff.ChunkIndex.readfrom(iostream)
+        self.assertEqual('chunk index truncated', str(ctx.exception))
+
+
+class Test_ChunkCache(TempFileTestCase):
+    def setUp(self):
+        super().setUp()
+        data = struct.pack('<4h', 1, -1, 2, -2)
+        self.path = self.tempfile(wavebytes(2, 16, data))
+
+    def test_index_hit_skips_parsing(self):
+        cache = riff.ChunkCache()
+        cache.index(self.path)
+        with unittest.mock.patch.object(riff.ChunkIndex, 'buildfrom') as mock:
+            cache.index(self.path)
+        mock.assert_not_called()
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_index_rebuilt_after_file_changes(self):
+        cache = riff.ChunkCache()
+        cache.index(self.path)
+        with open(self.path, 'wb') as iostream:
+            iostream.write(NESTED_RIFF)
+        index = cache.index(self.path)
+        self.assertEqual('MOCK', next(index.entries()).listtype)
+        self.assertEqual(2, cache.misses)
+
+    def test_wavechunk_from_rf64(self):
+        path = self.tempfile(RF64_WAVE)
+        with open(path, 'rb') as iostream:
+            wavechunk = riff.ChunkCache().wavechunk(path, iostream)
+            self.assertEqual([[1], [2]], wavechunk.readsamples().tolist())
+
+    def test_counts_one_lookup_per_call(self):
+        cache = riff.ChunkCache()
+        cache.formatchunk(self.path)
+        self.assertEqual((0, 1), (cache.hits, cache.misses))
+        cache.formatchunk(self.path)
+        cache.payload(self.path, 'data')
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+        with open(self.path, 'rb') as iostream:
+            cache.wavechunk(self.path, iostream)
+        self.assertEqual((2, 2), (cache.hits, cache.misses))
+
+    def test_formatchunk_is_cached(self):
+        cache = riff.ChunkCache()
+        formatchunk = cache.formatchunk(self.path)
+        self.assertEqual(2, formatchunk.channels)
+        self.assertIs(formatchunk, cache.formatchunk(self.path))
+
+    def test_payload_is_cached_within_byte_limit(self):
+        cache = riff.ChunkCache(maxbytes=8)
+        payload = cache.payload(self.path, 'data', 4)
+        self.assertEqual(b'\x01\x00\xff\xff', payload)
+        with unittest.mock.patch('builtins.open') as mock:
+            cache.payload(self.path, 'data', 4)
+        mock.assert_not_called()
+        self.assertEqual(4, cache.payloadbytes)
+
+    def test_payload_evicts_least_recently_used(self):
+        cache = riff.ChunkCache(maxbytes=7)
+        cache.payload(self.path, 'data', 4)
+        cache.payload(self.path, 'data', 2)
+        cache.payload(self.path, 'data', 4)
+        cache.payload(self.path, 'data', 3)
+        self.assertEqual(1, cache.evictions)
+        self.assertEqual(7, cache.payloadbytes)
+        misses = cache.misses
+        cache.payload(self.path, 'data', 4)
+        self.assertEqual(misses, cache.misses)
+
+    def test_error_for_missing_chunk(self):
+        cache = riff.ChunkCache()
+        with self.assertRaises(riff.Error) as ctx:
+            cache.payload(self.path, 'LIST/INFO')
+        self.assertEqual("no 'LIST/INFO' chunk found", str(ctx.exception))
+
+    def test_wavechunk_reads_frames(self):
+        cache = riff.ChunkCache()
+        with open(self.path, 'rb') as iostream:
+            wavechunk = cache.wavechunk(self.path, iostream)
+            self.assertEqual([[2, -2]], wavechunk.readsamples(1).tolist())
+
+
+class Test_ChunkData_copyto(TempFileTestCase):
+    def test_copies_remaining_stream_data(self):
+        iostream = io.BytesIO(b'SomeMockTestData')
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=8)
+        data.read(4)
+        output = io.BytesIO()
+        self.assertEqual(4, data.copyto(output))
+        self.assertEqual(b'Test', output.getvalue())
+        self.assertEqual(8, data.tell())
+
+    def test_copies_mapped_data(self):
+        data = riff.ChunkData.frombuffer(b'SomeMockTestData', 8, offset=4)
+        output = io.BytesIO()
+        data.copyto(output)
+        self.assertEqual(b'MockTest', output.getvalue())
+
+    def test_copies_in_blocks(self):
+        iostream = io.BytesIO(b'SomeMockTestData')
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=8)
+        output = unittest.mock.Mock(wraps=io.BytesIO())
+        with unittest.mock.patch.object(riff.ChunkData, 'COPY_BLOCK_SIZE', 3):
+            data.copyto(output)
+        self.assertEqual(3, output.write.call_count)
+
+    def test_copies_between_files(self):
+        path = self.tempfile(b'SomeMockTestData')
+        outpath = path + '.out'
+        with open(path, 'rb') as iostream, open(outpath, 'w+b') as output:
+            output.write(b'Head')
+            iostream.seek(4)
+            data = riff.ChunkData.streamfrom(iostream, size=8)
+            data.copyto(output)
+            output.write(b'Tail')
+        with open(outpath, 'rb') as output:
+            self.assertEqual(b'HeadMockTestTail', output.read())
+
+    @unittest.skipUnless(hasattr(os, 'copy_file_range'), 'no copy_file_range')
+    def test_copies_between_files_in_kernel(self):
+        path = self.tempfile(b'SomeMockTestData')
+        with open(path, 'rb') as iostream, open(path + '.out', 'wb') as output:
+            iostream.seek(4)
+            data = riff.ChunkData.streamfrom(iostream, size=8)
+            with unittest.mock.patch.object(
+                    riff.ChunkData, 'readinto') as readinto:
+                data.copyto(output)
+            readinto.assert_not_called()
+
+    def test_copies_decompressed_data(self):
+        path = self.tempfile(gzip.compress(b'SomeMockTestData'))
+        outpath = path + '.out'
+        with gzip.open(path, 'rb') as iostream, open(outpath, 'wb') as output:
+            iostream.seek(4)
+            data = riff.ChunkData.streamfrom(iostream, size=8)
+            data.copyto(output)
+        with open(outpath, 'rb') as output:
+            self.assertEqual(b'MockTest', output.read())
+
+    def test_falls_back_when_kernel_copy_fails(self):
+        path = self.tempfile(b'SomeMockTestData')
+        outpath = path + '.out'
+        copy_file_range = unittest.mock.Mock(side_effect=OSError)
+        with open(path, 'rb') as iostream, open(outpath, 'wb') as output:
+            iostream.seek(4)
+            data = riff.ChunkData.streamfrom(iostream, size=8)
+            with unittest.mock.patch.object(
+                    os, 'copy_file_range', copy_file_range, create=True):
+                data.copyto(output)
+        with open(outpath, 'rb') as output:
+            self.assertEqual(b'MockTest', output.read())
+
+    def test_error_when_data_truncated(self):
+        iostream = io.BytesIO(b'SomeMoc')
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=8)
+        with self.assertRaises(riff.Error) as ctx:
+            data.copyto(io.BytesIO())
+        self.assertEqual('truncated at position 3', str(ctx.exception))
+
+
+class Test_ChunkData_getbuffer(unittest.TestCase):
+    def test_returns_view_of_data(self):
+        data = riff.ChunkData.frombuffer(b'SomeMockTestData', 8, offset=4)
+        self.assertEqual(b'MockTest', data.getbuffer().tobytes())
+
+    def test_view_unaffected_by_cursor(self):
+        data = riff.ChunkData.frombuffer(b'SomeMockTestData', 8, offset=4)
+        data.read(4)
+        self.assertEqual(b'MockTest', data.getbuffer().tobytes())
+
+    def test_error_when_streaming(self):
+        iostream = io.BytesIO(b'SomeMockTestData')
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=8)
+        with self.assertRaises(io.UnsupportedOperation) as ctx:
+            data.getbuffer()
+        self.assertEqual('chunk data is not mapped', str(ctx.exception))
+
+
+class Test_ChunkData_read(TempFileTestCase):
     def test_reads_all_bytes_by_default(self):
         iostream = io.BytesIO(b'SomeMockTestData')
         iostream.seek(4)
@@ -232,6 +801,365 @@ class Test_ChunkData_read(unittest.TestCase):
         data.seek(4)
         self.assertEqual(b'Test', data.read(4))
 
+    def test_reads_from_buffer(self):
+        data = riff.ChunkData.frombuffer(b'SomeMockTestData', 8, offset=4)
+        data.seek(4)
+        self.assertEqual(b'Test', data.read(4))
+
+    def test_error_when_buffer_truncated(self):
+        data = riff.ChunkData.frombuffer(b'SomeMoc', 8, offset=4)
+        with self.assertRaises(riff.Error) as ctx:
+            data.read(4)
+        self.assertEqual('truncated at position 3', str(ctx.exception))
+
+    def test_no_seek_for_sequential_reads(self):
+        iostream = unittest.mock.Mock(wraps=io.BytesIO(b'SomeMockTestData'))
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=8)
+        iostream.reset_mock()
+        data.read(2)
+        data.read(2)
+        data.read(4)
+        self.assertEqual(1, iostream.seek.call_count)
+
+    def test_seeks_when_stream_moved_externally(self):
+        iostream = io.BytesIO(b'SomeMockTestData')
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=8)
+        data.read(2)
+        iostream.seek(0)
+        self.assertEqual(b'ck', data.read(2))
+
+    def test_no_seek_for_sequential_reads_from_raw_file(self):
+        path = self.tempfile(b'SomeMockTestData')
+        with open(path, 'r+b', buffering=0) as iostream:
+            iostream.seek(4)
+            first = riff.ChunkData.streamfrom(iostream, size=4)
+            second = riff.ChunkData.streamfrom(iostream, size=4)
+            with riff.IOStats() as stats:
+                self.assertEqual(b'Mo', first.read(2))
+                self.assertEqual(b'ck', first.read(2))
+                self.assertEqual(b'Te', second.read(2))
+                self.assertEqual(b'st', second.read(2))
+        self.assertEqual(1, stats.seeks)
+
+    def test_seeks_when_raw_file_moved_externally(self):
+        path = self.tempfile(b'SomeMockTestData')
+        with open(path, 'r+b', buffering=0) as iostream:
+            iostream.seek(4)
+            data = riff.ChunkData.streamfrom(iostream, size=4)
+            self.assertEqual(b'Mo', data.read(2))
+            iostream.seek(0)
+            iostream.read(3)
+            self.assertEqual(b'ck', data.read(2))
+
+    def test_buffered_reads_served_from_read_ahead(self):
+        iostream = unittest.mock.Mock(wraps=io.BytesIO(b'SomeMockTestData'))
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=8, buffersize=6)
+        iostream.reset_mock()
+        self.assertEqual(b'Mo', data.read(2))
+        self.assertEqual(b'ck', data.read(2))
+        self.assertEqual(b'Te', data.read(2))
+        self.assertEqual(1, iostream.read.call_count)
+        self.assertEqual(b'st', data.read(2))
+        self.assertEqual(2, iostream.read.call_count)
+
+    def test_buffered_reads_after_seek(self):
+        iostream = io.BytesIO(b'SomeMockTestData')
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=8, buffersize=4)
+        data.read(2)
+        data.seek(6)
+        self.assertEqual(b'st', data.read(2))
+        data.seek(1)
+        self.assertEqual(b'ock', data.read(3))
+
+    def test_large_buffered_read_bypasses_read_ahead(self):
+        iostream = io.BytesIO(b'SomeMockTestData')
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=8, buffersize=4)
+        self.assertEqual(b'MockTest', data.read())
+
+    def test_error_when_buffered_data_truncated(self):
+        iostream = io.BytesIO(b'SomeMoc')
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=8, buffersize=6)
+        with self.assertRaises(riff.Error) as ctx:
+            data.read(4)
+        self.assertEqual('truncated at position 3', str(ctx.exception))
+
+
+class Test_ChunkData_read_non_seekable(unittest.TestCase):
+    def test_reads_sequentially(self):
+        iostream = NonSeekableBytesIO(b'MockTestData')
+        data = riff.ChunkData.streamfrom(iostream, size=8)
+        self.assertEqual(b'Mock', data.read(4))
+        self.assertEqual(b'Test', data.read(4))
+
+    def test_does_not_consume_stream_on_creation(self):
+        iostream = NonSeekableBytesIO(b'MockTestData')
+        riff.ChunkData.streamfrom(iostream, size=8)
+        self.assertEqual(b'MockTestData', iostream.read())
+
+    def test_forward_seek_skips_data(self):
+        iostream = NonSeekableBytesIO(b'MockTestData')
+        data = riff.ChunkData.streamfrom(iostream, size=8)
+        data.seek(4)
+        self.assertEqual(b'Test', data.read(4))
+
+    def test_error_for_backward_seek(self):
+        iostream = NonSeekableBytesIO(b'MockTestData')
+        data = riff.ChunkData.streamfrom(iostream, size=8)
+        data.read(4)
+        data.seek(0)
+        with self.assertRaises(io.UnsupportedOperation) as ctx:
+            data.read(4)
+        self.assertEqual('chunk data is not seekable', str(ctx.exception))
+
+    def test_backward_seek_within_read_ahead(self):
+        iostream = NonSeekableBytesIO(b'MockTestData')
+        data = riff.ChunkData.streamfrom(iostream, size=8, buffersize=8)
+        data.read(4)
+        data.seek(0)
+        self.assertEqual(b'Mock', data.read(4))
+
+    def test_is_not_seekable(self):
+        iostream = NonSeekableBytesIO(b'MockTestData')
+        data = riff.ChunkData.streamfrom(iostream, size=8)
+        self.assertFalse(data.seekable())
+
+    def test_reads_from_pipe(self):
+        readfd, writefd = os.pipe()
+        with open(readfd, 'rb', buffering=0) as reader:
+            with open(writefd, 'wb') as writer:
+                writer.write(b'MockTestData')
+            data = riff.ChunkData.streamfrom(reader, size=8)
+            data.seek(4)
+            self.assertEqual(b'Test', data.read())
+
+
+class Test_ChunkData_digests(unittest.TestCase):
+    def chunkdata(self, contents, *algorithms):
+        data = riff.ChunkData.streamfrom(NonSeekableBytesIO(contents), 8)
+        for algorithm in algorithms:
+            data.addhash(algorithm)
+        return data
+
+    def test_hashes_blocks_as_they_are_read(self):
+        data = self.chunkdata(b'TestData', 'md5', 'crc32')
+        self.assertEqual(b'Test', data.read(4))
+        block = bytearray(4)
+        data.readinto(block)
+        self.assertEqual(
+            {
+                'md5': hashlib.md5(b'TestData').hexdigest(),
+                'crc32': '{:08x}'.format(zlib.crc32(b'TestData')),
+            },
+            dict(data.digests())
+        )
+
+    def test_hashes_data_skipped_by_seek(self):
+        data = self.chunkdata(b'TestData', 'sha1')
+        data.seek(4)
+        self.assertEqual(b'Data', data.read())
+        self.assertEqual(
+            hashlib.sha1(b'TestData').hexdigest(), data.digests()['sha1']
+        )
+
+    def test_hashes_unread_data(self):
+        data = self.chunkdata(b'TestData', 'crc32')
+        data.read(2)
+        self.assertEqual(
+            '{:08x}'.format(zlib.crc32(b'TestData')), data.digests()['crc32']
+        )
+
+    def test_hashes_copied_data(self):
+        data = riff.ChunkData.frombuffer(b'TestData', 8)
+        data.addhash('md5')
+        data.copyto(io.BytesIO())
+        self.assertEqual(
+            hashlib.md5(b'TestData').hexdigest(), data.digests()['md5']
+        )
+
+    def test_no_digests_without_hashes(self):
+        self.assertEqual({}, dict(self.chunkdata(b'TestData').digests()))
+
+    def test_error_adding_hash_after_reading(self):
+        data = self.chunkdata(b'TestData', 'md5')
+        data.read(1)
+        with self.assertRaises(riff.Error) as ctx:
+            data.addhash('crc32')
+        self.assertEqual('hashing already started', str(ctx.exception))
+
+    def test_error_for_truncated_data(self):
+        data = self.chunkdata(b'Test', 'md5')
+        with self.assertRaises(riff.Error) as ctx:
+            data.digests()
+        self.assertEqual('truncated at position 4', str(ctx.exception))
+
+
+class Test_ChunkData_readat(TempFileTestCase):
+    def test_reads_without_moving_cursor(self):
+        chunk = riff.Chunk.unpackfrom(b'MOCK\x08\x00\x00\x00MockData')
+        self.assertEqual(b'kDa', chunk.data.readat(3, 3))
+        self.assertEqual(0, chunk.data.tell())
+
+    def test_reads_from_stream(self):
+        iostream = io.BytesIO(b'MOCK\x08\x00\x00\x00MockData')
+        chunk = riff.Chunk.streamfrom(iostream)
+        self.assertEqual(b'Data', chunk.data.readat(4, 10))
+
+    def test_reads_file_without_moving_file_position(self):
+        path = self.tempfile(NESTED_RIFF)
+        with open(path, 'rb') as iostream:
+            riffchunk = riff.RiffChunk.streamfrom(iostream)
+            position = iostream.tell()
+            icmt = riffchunk.find('LIST/INFO/ICMT')
+            self.assertEqual(b'Hi', icmt.data.read())
+            self.assertEqual(b'BB', riffchunk.find('CNKB').data.readat(2, 2))
+            self.assertEqual(position, iostream.tell())
+
+    def test_concurrent_reads_from_shared_file(self):
+        buffer = bytes(range(256)) * 64
+        path = self.tempfile(b''.join([
+            b'RIFF', struct.pack('<I', len(buffer) + 4), b'MOCK',
+            b'DATA', struct.pack('<I', len(buffer) - 8), buffer[8:],
+        ]))
+        with open(path, 'rb') as iostream:
+            data = riff.RiffChunk.streamfrom(iostream).find('DATA').data
+            with concurrent.futures.ThreadPoolExecutor(8) as executor:
+                results = list(executor.map(
+                    lambda offset: data.readat(offset, 512),
+                    range(0, data.size - 512, 97)
+                ))
+        for index, result in enumerate(results):
+            offset = 8 + index * 97
+            self.assertEqual(buffer[offset:offset + 512], result)
+
+    def test_concurrent_with_reads_of_other_chunk(self):
+        class YieldingBytesIO(io.BytesIO):
+            def seek(self, *args):
+                position = super().seek(*args)
+                time.sleep(0.0001)
+                return position
+
+        buffer = bytes(range(256)) * 8
+        iostream = YieldingBytesIO(b''.join([
+            b'RIFF', struct.pack('<I', 2 * len(buffer) + 20), b'MOCK',
+            b'CNKA', struct.pack('<I', len(buffer)), buffer,
+            b'CNKB', struct.pack('<I', len(buffer)), buffer[::-1],
+        ]))
+        riffchunk = riff.RiffChunk.streamfrom(iostream)
+        first = riffchunk.find('CNKA').data
+        second = riffchunk.find('CNKB').data
+
+        def readsecond():
+            for _ in range(len(buffer) // 16):
+                second.seek(16, io.SEEK_CUR)
+                second.read(1)
+
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            future = executor.submit(readsecond)
+            results = [
+                first.readat(offset, 16)
+                for offset in range(0, len(buffer), 16)
+            ]
+            future.result()
+        self.assertEqual(buffer, b''.join(results))
+
+    def test_reads_decompressed_file(self):
+        path = self.tempfile(gzip.compress(NESTED_RIFF))
+        with gzip.open(path, 'rb') as iostream:
+            riffchunk = riff.RiffChunk.streamfrom(iostream)
+            self.assertEqual('MOCK', riffchunk.format)
+            self.assertEqual(b'BB', riffchunk.find('CNKB').data.readat(2, 2))
+
+    def test_reads_file_open_for_writing(self):
+        path = self.tempfile(b'')
+        with open(path, 'w+b') as iostream:
+            iostream.write(NESTED_RIFF)
+            iostream.seek(0)
+            riffchunk = riff.RiffChunk.streamfrom(iostream)
+            self.assertEqual(b'AAA', riffchunk.find('CNKA').data.readat(0, 3))
+
+    def test_error_when_truncated(self):
+        chunk = riff.Chunk.streamfrom(io.BytesIO(b'MOCK\x08\x00\x00\x00Mock'))
+        with self.assertRaises(riff.Error) as ctx:
+            chunk.data.readat(2, 4)
+        self.assertEqual('truncated at position 4', str(ctx.exception))
+
+
+class Test_ChunkData_readinto(unittest.TestCase):
+    def test_fills_buffer_from_cursor_position(self):
+        iostream = io.BytesIO(b'SomeMockTestData')
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=8)
+        data.seek(2)
+        buffer = bytearray(4)
+        self.assertEqual(4, data.readinto(buffer))
+        self.assertEqual(b'ckTe', buffer)
+        self.assertEqual(6, data.tell())
+
+    def test_reading_past_end_only_fills_size_bytes(self):
+        iostream = io.BytesIO(b'SomeMockTestData')
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=8)
+        buffer = bytearray(10)
+        self.assertEqual(8, data.readinto(buffer))
+        self.assertEqual(b'MockTest\x00\x00', buffer)
+
+    def test_returns_zero_at_end(self):
+        iostream = io.BytesIO(b'SomeMockTestData')
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=8)
+        data.seek(0, io.SEEK_END)
+        self.assertEqual(0, data.readinto(bytearray(4)))
+
+    def test_fills_typed_buffer(self):
+        iostream = io.BytesIO(b'Some\x01\x00\x02\x00Data')
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=4)
+        samples = array.array('h', [0, 0])
+        data.readinto(samples)
+        self.assertEqual([1, 2], samples.tolist())
+
+    def test_fills_buffer_from_read_ahead(self):
+        iostream = io.BytesIO(b'SomeMockTestData')
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=8, buffersize=8)
+        data.read(2)
+        buffer = bytearray(4)
+        data.readinto(buffer)
+        self.assertEqual(b'ckTe', buffer)
+
+    def test_fills_buffer_from_mapped_data(self):
+        data = riff.ChunkData.frombuffer(b'SomeMockTestData', 8, offset=4)
+        buffer = bytearray(4)
+        data.readinto(buffer)
+        self.assertEqual(b'Mock', buffer)
+
+    def test_error_when_data_truncated(self):
+        iostream = io.BytesIO(b'SomeMoc')
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=8)
+        with self.assertRaises(riff.Error) as ctx:
+            data.readinto(bytearray(4))
+        self.assertEqual('truncated at position 3', str(ctx.exception))
+
+    def test_can_wrap_in_buffered_reader(self):
+        iostream = io.BytesIO(b'SomeMockTestData')
+        iostream.seek(4)
+        data = riff.ChunkData.streamfrom(iostream, size=8)
+        reader = io.BufferedReader(data)
+        self.assertEqual(b'Mo', reader.read(2))
+        self.assertEqual(b'ckTest', reader.read())
+
+    def test_is_RawIOBase_instance(self):
+        iostream = io.BytesIO(b'SomeMockTestData')
+        data = riff.ChunkData.streamfrom(iostream, size=8)
+        self.assertIsInstance(data, io.RawIOBase)
+
 
 class Test_ChunkData_repr(unittest.TestCase):
     def test(self):
@@ -377,6 +1305,537 @@ class Test_ChunkData_tell(unittest.TestCase):
         self.assertEqual(position_before, data.tell())
 
 
+class Test_ChunkWriter(unittest.TestCase):
+    def test_back_patches_size(self):
+        output = io.BytesIO()
+        with riff.ChunkWriter(output, 'MOCK') as writer:
+            writer.write(b'Mock')
+            writer.write(b'Data')
+        self.assertEqual(b'MOCK\x08\x00\x00\x00MockData', output.getvalue())
+        self.assertEqual(8, writer.size)
+
+    def test_writes_pad_byte(self):
+        output = io.BytesIO()
+        with riff.ChunkWriter(output, 'MOCK') as writer:
+            writer.write(b'Odd')
+        self.assertEqual(b'MOCK\x03\x00\x00\x00Odd\x00', output.getvalue())
+
+    def test_writes_from_chunk_data(self):
+        chunk = riff.Chunk.unpackfrom(b'MOCK\x04\x00\x00\x00Data')
+        output = io.BytesIO()
+        with riff.ChunkWriter(output, 'COPY') as writer:
+            writer.writefrom(chunk.data)
+        self.assertEqual(b'COPY\x04\x00\x00\x00Data', output.getvalue())
+
+    def test_ValueError_when_writing_after_close(self):
+        writer = riff.ChunkWriter(io.BytesIO(), 'MOCK')
+        writer.close()
+        with self.assertRaises(ValueError) as ctx:
+            writer.write(b'Data')
+        self.assertEqual('chunk writer is closed', str(ctx.exception))
+
+    def test_error_when_size_too_large(self):
+        output = io.BytesIO()
+        writer = riff.ChunkWriter(output, 'MOCK')
+        writer.write(b'Data')
+        with unittest.mock.patch.object(riff.ChunkHeader, 'MAX_SIZE', 3):
+            with self.assertRaises(riff.Error) as ctx:
+                writer.close()
+        self.assertEqual('chunk size 4 too large', str(ctx.exception))
+
+
+class Test_RiffEditor(TempFileTestCase):
+    def setUp(self):
+        super().setUp()
+        output = io.BytesIO()
+        with riff.RiffWriter(output, 'MOCK', reserve=False) as writer:
+            writer.subchunk('CNKA').write(b'AAAAAAAAAA')
+            writer.subchunk('CNKB').write(b'BBBB')
+            writer.subchunk('CNKC').write(b'CC')
+        self.path = self.tempfile(output.getvalue())
+        self.iostream = open(self.path, 'r+b')
+        self.addCleanup(self.iostream.close)
+
+    def readback(self):
+        self.iostream.flush()
+        with open(self.path, 'rb') as iostream:
+            riffchunk = riff.RiffChunk.readfrom(iostream)
+            self.assertEqual(0, len(iostream.read()))
+        return [
+            (subchunk.id, subchunk.data.read())
+            for subchunk in riffchunk.subchunks()
+        ]
+
+    def test_overwrites_chunk_of_same_size(self):
+        editor = riff.RiffEditor(self.iostream)
+        editor.replace('CNKB', b'bbbb')
+        self.assertEqual(
+            [('CNKA', b'AAAAAAAAAA'), ('CNKB', b'bbbb'), ('CNKC', b'CC')],
+            self.readback()
+        )
+
+    def test_pads_smaller_chunk_with_junk(self):
+        editor = riff.RiffEditor(self.iostream)
+        editor.replace('CNKA', b'a')
+        chunks = self.readback()
+        self.assertEqual(('CNKA', b'a'), chunks[0])
+        self.assertEqual('JUNK', chunks[1][0])
+        self.assertEqual(('CNKC', b'CC'), chunks[3])
+
+    def test_grows_into_following_junk(self):
+        editor = riff.RiffEditor(self.iostream)
+        editor.replace('CNKA', b'a')
+        editor.replace('CNKA', b'aaaaaaaaaa')
+        self.assertEqual(
+            [('CNKA', b'aaaaaaaaaa'), ('CNKB', b'BBBB'), ('CNKC', b'CC')],
+            self.readback()
+        )
+
+    def test_rewrites_last_chunk_in_place(self):
+        editor = riff.RiffEditor(self.iostream)
+        editor.replace('CNKC', b'ccccccc')
+        self.assertEqual(
+            [('CNKA', b'AAAAAAAAAA'), ('CNKB', b'BBBB'), ('CNKC', b'ccccccc')],
+            self.readback()
+        )
+
+    def test_moves_small_trailing_chunks(self):
+        editor = riff.RiffEditor(self.iostream)
+        editor.replace('CNKA', b'a' * 20)
+        self.assertEqual(
+            [('CNKA', b'a' * 20), ('CNKB', b'BBBB'), ('CNKC', b'CC')],
+            self.readback()
+        )
+
+    def test_error_for_rf64(self):
+        with self.assertRaises(riff.Error) as ctx:
+            riff.RiffEditor(io.BytesIO(RF64_WAVE))
+        self.assertEqual('rf64 chunks cannot be edited', str(ctx.exception))
+
+    def test_error_leaves_chunk_when_data_follows_riff_chunk(self):
+        self.iostream.seek(0, io.SEEK_END)
+        self.iostream.write(b'id3 \x04\x00\x00\x00TAG!')
+        editor = riff.RiffEditor(self.iostream)
+        with self.assertRaises(riff.Error) as ctx:
+            editor.replace('CNKA', b'AAAAAA')
+        self.assertEqual(
+            'riff chunk does not end at end of file', str(ctx.exception)
+        )
+        self.assertEqual(
+            ['CNKA', 'CNKB', 'CNKC'], [entry.id for entry in editor.entries()]
+        )
+        self.iostream.seek(12)
+        self.assertEqual(b'CNKA', self.iostream.read(4))
+
+    def test_appends_when_trailing_chunks_too_large_to_move(self):
+        editor = riff.RiffEditor(self.iostream)
+        with unittest.mock.patch.object(riff.RiffEditor, 'MOVE_LIMIT', 0):
+            editor.replace('CNKA', b'a' * 20)
+        chunks = self.readback()
+        self.assertEqual(['JUNK', 'CNKB', 'CNKC'], [c[0] for c in chunks[:3]])
+        self.assertEqual(('CNKA', b'a' * 20), chunks[3])
+
+    def test_does_not_rewrite_large_chunks(self):
+        iostream = unittest.mock.Mock(wraps=self.iostream)
+        editor = riff.RiffEditor(iostream)
+        with unittest.mock.patch.object(riff.RiffEditor, 'MOVE_LIMIT', 0):
+            editor.replace('CNKA', b'a' * 20)
+        writes = [call[0][0] for call in iostream.write.call_args_list]
+        self.assertEqual(44, sum(len(buffer) for buffer in writes))
+
+    def test_appends_missing_chunk(self):
+        editor = riff.RiffEditor(self.iostream)
+        editor.replace('CNKD', b'D')
+        self.assertEqual(('CNKD', b'D'), self.readback()[3])
+
+    def test_removes_chunk(self):
+        editor = riff.RiffEditor(self.iostream)
+        editor.remove('CNKB')
+        ids = [chunk[0] for chunk in self.readback()]
+        self.assertEqual(['CNKA', 'JUNK', 'CNKC'], ids)
+
+    def test_finds_list_by_type(self):
+        self.iostream.seek(0)
+        self.iostream.write(NESTED_RIFF)
+        self.iostream.truncate()
+        editor = riff.RiffEditor(self.iostream)
+        self.assertEqual(24, editor.find('LIST', 'INFO').headerpos)
+        self.assertIsNone(editor.find('LIST', 'adtl'))
+
+    def test_error_when_removing_missing_chunk(self):
+        editor = riff.RiffEditor(self.iostream)
+        with self.assertRaises(riff.Error) as ctx:
+            editor.remove('NONE')
+        self.assertEqual("no 'NONE' chunk found", str(ctx.exception))
+
+
+class Test_RiffWriter(unittest.TestCase):
+    def test_writes_nested_chunks(self):
+        output = io.BytesIO()
+        with riff.RiffWriter(output, 'MOCK', reserve=False) as writer:
+            writer.subchunk('CNKA').write(b'AAA')
+            with writer.sublist('INFO') as info:
+                info.subchunk('INAM').write(b'Name')
+                info.subchunk('ICMT').write(b'Hi')
+            writer.subchunk('CNKB').write(b'BBBB')
+        self.assertEqual(NESTED_RIFF, output.getvalue())
+
+    def test_output_can_be_read_back(self):
+        output = io.BytesIO()
+        with riff.RiffWriter(output, 'MOCK') as writer:
+            writer.subchunk('CNKA').write(b'AAA')
+            writer.writechunk(riff.Chunk.unpackfrom(b'CNKB\x01\x00\x00\x00B'))
+        output.seek(0)
+        riffchunk = riff.RiffChunk.readfrom(output)
+        self.assertEqual(
+            [bytes(28), b'AAA', b'B'],
+            [subchunk.data.read() for subchunk in riffchunk.subchunks()]
+        )
+
+    def test_reserves_junk_chunk_for_ds64(self):
+        output = io.BytesIO()
+        riff.RiffWriter(output, 'MOCK').close()
+        self.assertEqual(
+            b'RIFF\x28\x00\x00\x00MOCKJUNK\x1c\x00\x00\x00' + bytes(28),
+            output.getvalue()
+        )
+
+    def test_promotes_to_rf64_when_too_large(self):
+        output = io.BytesIO()
+        with unittest.mock.patch.object(riff.ChunkHeader, 'MAX_SIZE', 40):
+            with riff.RiffWriter(output, 'WAVE') as writer:
+                writer.subchunk('fmt ').write(b'F' * 16)
+                writer.subchunk('data').write(b'D' * 41)
+            output.seek(0)
+            riffchunk = riff.RiffChunk.readfrom(output)
+        self.assertEqual(b'RF64(\x00\x00\x00WAVEds64', output.getvalue()[:16])
+        self.assertEqual(114, riffchunk.size)
+        subchunks = list(riffchunk.subchunks())
+        self.assertEqual(['ds64', 'fmt ', 'data'], [s.id for s in subchunks])
+        self.assertEqual(41, subchunks[2].size)
+        self.assertEqual(b'D' * 41, subchunks[2].data.read())
+
+    def test_error_when_other_subchunk_too_large(self):
+        writer = riff.RiffWriter(io.BytesIO(), 'MOCK')
+        subchunk = writer.subchunk('MOCK')
+        subchunk.write(b'Data')
+        with unittest.mock.patch.object(riff.ChunkHeader, 'MAX_SIZE', 3):
+            with self.assertRaises(riff.Error) as ctx:
+                subchunk.close()
+        self.assertEqual('chunk size 4 too large', str(ctx.exception))
+
+    def test_closing_writer_closes_open_subchunk(self):
+        output = io.BytesIO()
+        writer = riff.RiffWriter(output, 'MOCK')
+        subchunk = writer.subchunk('CNKA')
+        writer.close()
+        self.assertTrue(subchunk.closed)
+
+
+RF64_WAVE = b''.join([
+    b'RF64\xff\xff\xff\xffWAVE',
+    b'ds64\x28\x00\x00\x00',
+    struct.pack('<QQQI', 98, 4, 2, 1), b'BIGC', struct.pack('<Q', 2),
+    b'fmt \x10\x00\x00\x00',
+    struct.pack('<HHIIHH', 1, 1, 8000, 16000, 2, 16),
+    b'BIGC\xff\xff\xff\xffCC',
+    b'data\xff\xff\xff\xff\x01\x00\x02\x00',
+])
+
+
+class Test_RiffChunk_recoverfrom(unittest.TestCase):
+    def recovered(self, buffer):
+        riffchunk = riff.RiffChunk.recoverfrom(buffer)
+        return [
+            (subchunk.id, subchunk.data.read(), subchunk.truncated)
+            for subchunk in riffchunk.subchunks()
+        ]
+
+    def test_recovers_intact_file(self):
+        self.assertEqual(
+            [
+                ('CNKA', b'AAA', False),
+                ('LIST', NESTED_RIFF[32:58], False),
+                ('CNKB', b'BBBB', False),
+            ],
+            self.recovered(NESTED_RIFF)
+        )
+
+    def test_marks_truncated_chunk_with_available_length(self):
+        riffchunk = riff.RiffChunk.recoverfrom(NESTED_RIFF[:68])
+        subchunk = list(riffchunk.subchunks())[2]
+        self.assertTrue(subchunk.truncated)
+        self.assertEqual(4, subchunk.size)
+        self.assertEqual(b'BB', subchunk.data.read())
+
+    def test_resyncs_after_corrupt_header(self):
+        buffer = bytearray(NESTED_RIFF)
+        buffer[24:28] = b'\x00\xff\x00\xff'
+        self.assertEqual(
+            [
+                ('CNKA', b'AAA', False),
+                ('INAM', b'Name', False),
+                ('ICMT', b'Hi', False),
+                ('CNKB', b'BBBB', False),
+            ],
+            self.recovered(buffer)
+        )
+
+    def test_resyncs_after_plausible_header_with_corrupt_size(self):
+        buffer = bytearray(NESTED_RIFF)
+        buffer[28:32] = b'\xff\xff\xff\x7f'
+        self.assertEqual(
+            [
+                ('CNKA', b'AAA', False),
+                ('LIST', b'INFO', False),
+                ('INAM', b'Name', False),
+                ('ICMT', b'Hi', False),
+                ('CNKB', b'BBBB', False),
+            ],
+            self.recovered(buffer)
+        )
+
+    def test_keeps_declared_size_of_chunk_cut_off_by_end_of_buffer(self):
+        payload = b'\x10\x27abcd\x02\x00\x00\x00\xf0\xd8' * 400
+        buffer = (
+            b'RIFF\x4c\x1f\x00\x00WAVE'
+            b'data\x40\x1f\x00\x00' + payload
+        )
+        riffchunk = riff.RiffChunk.recoverfrom(buffer[:2000])
+        subchunks = list(riffchunk.subchunks())
+        self.assertEqual(['data'], [subchunk.id for subchunk in subchunks])
+        self.assertTrue(subchunks[0].truncated)
+        self.assertEqual(8000, subchunks[0].size)
+        self.assertEqual(payload[:1980], subchunks[0].data.read())
+
+    def test_scans_to_end_when_riff_size_unset(self):
+        buffer = b'RIFF\x00\x00\x00\x00' + NESTED_RIFF[8:]
+        self.assertEqual(
+            ['CNKA', 'LIST', 'CNKB'],
+            [subchunk[0] for subchunk in self.recovered(buffer)]
+        )
+
+    def test_error_for_non_riff_id(self):
+        with self.assertRaises(riff.Error) as ctx:
+            riff.RiffChunk.recoverfrom(b'MOCK\x04\x00\x00\x00TEST')
+        self.assertEqual("unexpected chunk id 'MOCK'", str(ctx.exception))
+
+
+class Test_RiffChunk_rf64(TempFileTestCase):
+    def assertRf64(self, riffchunk):
+        self.assertEqual('WAVE', riffchunk.format)
+        self.assertEqual(len(RF64_WAVE) - 8, riffchunk.size)
+        subchunks = list(riffchunk.subchunks())
+        self.assertEqual(
+            [('ds64', 40), ('fmt ', 16), ('BIGC', 2), ('data', 4)],
+            [(subchunk.id, subchunk.size) for subchunk in subchunks]
+        )
+        self.assertEqual(b'\x01\x00\x02\x00', subchunks[3].data.read())
+
+    def test_readfrom(self):
+        self.assertRf64(riff.RiffChunk.readfrom(io.BytesIO(RF64_WAVE)))
+
+    def test_streamfrom(self):
+        self.assertRf64(riff.RiffChunk.streamfrom(io.BytesIO(RF64_WAVE)))
+
+    def test_streamfrom_non_seekable(self):
+        iostream = NonSeekableBytesIO(RF64_WAVE)
+        riffchunk = riff.RiffChunk.streamfrom(iostream, lazy=True)
+        self.assertEqual(
+            ['ds64', 'fmt ', 'BIGC', 'data'],
+            [subchunk.id for subchunk in riffchunk.subchunks()]
+        )
+        self.assertEqual(4, riffchunk.find('data').size)
+
+    def test_mapfrom(self):
+        path = self.tempfile(RF64_WAVE)
+        self.assertRf64(riff.RiffChunk.mapfrom(path))
+
+    def test_wave_chunk_reads_frames(self):
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(RF64_WAVE))
+        self.assertEqual(2, wavechunk.frames)
+
+    def test_error_when_ds64_missing(self):
+        buffer = b'RF64\xff\xff\xff\xffWAVEJUNK' + bytes(20)
+        with self.assertRaises(riff.Error) as ctx:
+            riff.RiffChunk.readfrom(io.BytesIO(buffer))
+        self.assertEqual('no ds64 chunk found', str(ctx.exception))
+
+
+class Test_Ds64Chunk_fromchunk(unittest.TestCase):
+    def test_reads_sizes(self):
+        chunk = riff.Chunk.unpackfrom(RF64_WAVE, 12)
+        ds64 = riff.Ds64Chunk.fromchunk(chunk)
+        self.assertEqual(98, ds64.riffsize)
+        self.assertEqual(4, ds64.datasize)
+        self.assertEqual(2, ds64.samplecount)
+        self.assertEqual(2, ds64.sizefor('BIGC'))
+        self.assertIsNone(ds64.sizefor('NONE'))
+
+    def test_error_when_truncated(self):
+        chunk = riff.Chunk.unpackfrom(b'ds64\x04\x00\x00\x00\x00\x00\x00\x00')
+        with self.assertRaises(riff.Error) as ctx:
+            riff.Ds64Chunk.fromchunk(chunk)
+        self.assertEqual('ds64 chunk truncated', str(ctx.exception))
+
+
+class Test_IOStats(unittest.TestCase):
+    def test_counts_chunks_and_bytes_read(self):
+        with riff.IOStats() as stats:
+            riffchunk = riff.RiffChunk.streamfrom(io.BytesIO(NESTED_RIFF))
+            riffchunk.find('CNKB').data.read()
+        self.assertEqual(4, stats.chunks)
+        self.assertEqual(8 + 4 + 8 + 1 + 8 + 8 + 4, stats.bytesread)
+        self.assertGreater(stats.seeks, 0)
+        self.assertGreater(stats.readtime, 0)
+        self.assertGreater(stats.headertime, 0)
+
+    def test_counts_bytes_copied_by_readfrom(self):
+        with riff.IOStats() as stats:
+            riff.Chunk.readfrom(io.BytesIO(b'MOCK\x04\x00\x00\x00Data'))
+        self.assertEqual(4, stats.bytescopied)
+        self.assertEqual(1, stats.chunks)
+
+    def test_stops_recording_on_exit(self):
+        with riff.IOStats() as stats:
+            pass
+        riff.Chunk.readfrom(io.BytesIO(b'MOCK\x04\x00\x00\x00Data'))
+        self.assertEqual(0, stats.chunks)
+        self.assertEqual([], riff._hooks)
+
+
+class Test_addhook(unittest.TestCase):
+    def test_hook_receives_events(self):
+        events = []
+
+        def hook(event, value):
+            events.append(event)
+        riff.addhook(hook)
+        try:
+            riff.Chunk.unpackfrom(b'MOCK\x00\x00\x00\x00')
+        finally:
+            riff.removehook(hook)
+        self.assertEqual(['chunk'], events)
+
+
+class Test_RiffChunk_find(unittest.TestCase):
+    def test_finds_top_level_subchunk(self):
+        riffchunk = riff.RiffChunk.readfrom(io.BytesIO(NESTED_RIFF))
+        self.assertEqual(b'BBBB', riffchunk.find('CNKB').data.read())
+
+    def test_finds_nested_subchunk_by_path(self):
+        riffchunk = riff.RiffChunk.readfrom(io.BytesIO(NESTED_RIFF))
+        subchunk = riffchunk.find('LIST/INFO/INAM')
+        self.assertEqual(b'Name', subchunk.data.read())
+
+    def test_returns_ListChunk_for_list_type_path(self):
+        riffchunk = riff.RiffChunk.readfrom(io.BytesIO(NESTED_RIFF))
+        listchunk = riffchunk.find('LIST/INFO')
+        self.assertIsInstance(listchunk, riff.ListChunk)
+        self.assertEqual('INFO', listchunk.listtype)
+
+    def test_returns_same_ListChunk_on_repeated_lookup(self):
+        riffchunk = riff.RiffChunk.readfrom(io.BytesIO(NESTED_RIFF))
+        self.assertIs(riffchunk.find('LIST/INFO'), riffchunk.find('LIST/INFO'))
+
+    def test_returns_None_for_wrong_list_type(self):
+        riffchunk = riff.RiffChunk.readfrom(io.BytesIO(NESTED_RIFF))
+        self.assertIsNone(riffchunk.find('LIST/movi/INAM'))
+
+    def test_returns_None_when_not_found(self):
+        riffchunk = riff.RiffChunk.readfrom(io.BytesIO(NESTED_RIFF))
+        self.assertIsNone(riffchunk.find('NONE'))
+
+    def test_finds_nested_subchunk_when_streaming(self):
+        iostream = io.BytesIO(NESTED_RIFF)
+        riffchunk = riff.RiffChunk.streamfrom(iostream)
+        subchunk = riffchunk.find('LIST/INFO/ICMT')
+        self.assertEqual(b'Hi', subchunk.data.read())
+
+    def test_finds_nested_subchunk_when_non_seekable(self):
+        iostream = NonSeekableBytesIO(NESTED_RIFF)
+        riffchunk = riff.RiffChunk.streamfrom(iostream)
+        subchunk = riffchunk.find('LIST/INFO/ICMT')
+        self.assertEqual(b'Hi', subchunk.data.read())
+
+    def test_stops_reading_at_first_match(self):
+        riffchunk = riff.RiffChunk.readfrom(io.BytesIO(NESTED_RIFF), lazy=True)
+        riffchunk.find('CNKA')
+        self.assertEqual(1, len(riffchunk._subchunks))
+
+
+class Test_RiffChunk_findall(unittest.TestCase):
+    def test_finds_all_matching_subchunks(self):
+        riffchunk = riff.RiffChunk.readfrom(io.BytesIO(
+            b'RIFF\x1e\x00\x00\x00MOCK'
+            b'CNKA\x02\x00\x00\x00AA'
+            b'CNKB\x00\x00\x00\x00'
+            b'CNKA\x00\x00\x00\x00'
+        ))
+        subchunks = list(riffchunk.findall('CNKA'))
+        self.assertEqual([2, 0], [subchunk.size for subchunk in subchunks])
+
+    def test_finds_nothing_below_non_list_subchunk(self):
+        riffchunk = riff.RiffChunk.readfrom(io.BytesIO(NESTED_RIFF))
+        self.assertEqual([], list(riffchunk.findall('CNKA/AAA/INAM')))
+
+
+class Test_RiffChunk_fromindex(unittest.TestCase):
+    def test_reads_format_and_subchunks(self):
+        iostream = io.BytesIO(NESTED_RIFF)
+        index = riff.ChunkIndex.buildfrom(iostream)
+        riffchunk = riff.RiffChunk.fromindex(index, iostream)
+        self.assertEqual('MOCK', riffchunk.format)
+        ids = [subchunk.id for subchunk in riffchunk.subchunks()]
+        self.assertEqual(['CNKA', 'LIST', 'CNKB'], ids)
+
+    def test_does_not_read_stream(self):
+        index = riff.ChunkIndex.buildfrom(io.BytesIO(NESTED_RIFF))
+        iostream = unittest.mock.Mock()
+        riffchunk = riff.RiffChunk.fromindex(index, iostream)
+        list(riffchunk.subchunks())
+        iostream.read.assert_not_called()
+
+    def test_subchunk_data_read_from_stream(self):
+        iostream = io.BytesIO(NESTED_RIFF)
+        index = riff.ChunkIndex.buildfrom(iostream)
+        riffchunk = riff.RiffChunk.fromindex(index, iostream)
+        subchunk = list(riffchunk.subchunks())[2]
+        self.assertEqual(b'BBBB', subchunk.data.read())
+
+    def test_error_for_non_riff_id(self):
+        iostream = io.BytesIO(b'MOCK\x04\x00\x00\x00TEST')
+        index = riff.ChunkIndex.buildfrom(iostream)
+        with self.assertRaises(riff.Error) as ctx:
+            riff.RiffChunk.fromindex(index, iostream)
+        self.assertEqual("unexpected chunk id 'MOCK'", str(ctx.exception))
+
+
+class Test_RiffChunk_mapfrom(TempFileTestCase):
+    def test_reads_format(self):
+        path = self.tempfile(b'RIFF\x04\x00\x00\x00MOCK')
+        riffchunk = riff.RiffChunk.mapfrom(path)
+        self.assertEqual('MOCK', riffchunk.format)
+
+    def test_reads_subchunks(self):
+        path = self.tempfile(
+            b'RIFF\x1c\x00\x00\x00MOCK'
+            b'CNKA\x03\x00\x00\x00AAA\x00'
+            b'CNKB\x04\x00\x00\x00BBBB'
+        )
+        riffchunk = riff.RiffChunk.mapfrom(path)
+        subchunks = list(riffchunk.subchunks())
+        self.assertEqual(['CNKA', 'CNKB'], [s.id for s in subchunks])
+        self.assertEqual(b'AAA', subchunks[0].data.read())
+        self.assertEqual(b'BBBB', subchunks[1].data.read())
+
+    def test_error_for_non_riff_id(self):
+        path = self.tempfile(b'MOCK\x04\x00\x00\x00TEST')
+        with self.assertRaises(riff.Error) as ctx:
+            riff.RiffChunk.mapfrom(path)
+        self.assertEqual("unexpected chunk id 'MOCK'", str(ctx.exception))
+
+
 class Test_RiffChunk_readfrom(unittest.TestCase):
     def test_error_for_non_riff_id(self):
         iostream = io.BytesIO(b'MOCK\x04\x00\x00\x00TEST')
@@ -398,6 +1857,147 @@ class Test_RiffChunk_readfrom(unittest.TestCase):
         self.assertEqual(expected_message, str(ctx.exception))
 
 
+class Test_RiffChunk_astreamfrom(unittest.TestCase):
+    def test_reads_format(self):
+        async def run():
+            reader = streamreader(NESTED_RIFF)
+            return await riff.RiffChunk.astreamfrom(reader)
+        self.assertEqual('MOCK', runasync(run()).format)
+
+    def test_reads_subchunk_data_in_order(self):
+        async def run():
+            reader = streamreader(NESTED_RIFF)
+            riffchunk = await riff.RiffChunk.astreamfrom(reader)
+            buffers = []
+            async for subchunk in riffchunk.asubchunks():
+                buffers.append(await subchunk.data.read(4))
+            return buffers
+        self.assertEqual([b'AAA', b'INFO', b'BBBB'], runasync(run()))
+
+    def test_skips_unread_subchunk_data(self):
+        async def run():
+            reader = streamreader(NESTED_RIFF)
+            riffchunk = await riff.RiffChunk.astreamfrom(reader)
+            subchunks = []
+            async for subchunk in riffchunk.asubchunks():
+                subchunks.append(subchunk)
+            return subchunks, await subchunks[2].data.read()
+        subchunks, buffer = runasync(run())
+        ids = [subchunk.id for subchunk in subchunks]
+        self.assertEqual(['CNKA', 'LIST', 'CNKB'], ids)
+        self.assertEqual(b'BBBB', buffer)
+
+    def test_error_reading_skipped_subchunk_data(self):
+        async def run():
+            reader = streamreader(NESTED_RIFF)
+            riffchunk = await riff.RiffChunk.astreamfrom(reader)
+            subchunks = []
+            async for subchunk in riffchunk.asubchunks():
+                subchunks.append(subchunk)
+            await subchunks[0].data.read()
+        with self.assertRaises(io.UnsupportedOperation):
+            runasync(run())
+
+    def test_reads_nested_subchunks(self):
+        async def run():
+            reader = streamreader(NESTED_RIFF)
+            riffchunk = await riff.RiffChunk.astreamfrom(reader)
+            subchunks = riffchunk.asubchunks()
+            await subchunks.__anext__()
+            listchunk = await subchunks.__anext__()
+            await listchunk.data.read(4)
+            inam = await riff.Chunk.astreamfrom(listchunk.data)
+            return await inam.data.read()
+        self.assertEqual(b'Name', runasync(run()))
+
+    def test_error_when_data_truncated(self):
+        async def run():
+            reader = streamreader(NESTED_RIFF[:14])
+            riffchunk = await riff.RiffChunk.astreamfrom(reader)
+            subchunk = await riffchunk.asubchunks().__anext__()
+            await subchunk.data.read()
+        with self.assertRaises(riff.Error):
+            runasync(run())
+
+
+class Test_RiffChunk_streamfrom_hashes(unittest.TestCase):
+    HASHES = {'*': ['crc32'], 'CNKB': ['md5']}
+
+    def crc32(self, buffer):
+        return '{:08x}'.format(zlib.crc32(buffer))
+
+    def test_hashes_subchunks_in_one_pass(self):
+        iostream = NonSeekableBytesIO(NESTED_RIFF)
+        riffchunk = riff.RiffChunk.streamfrom(
+            iostream, lazy=True, hashes=self.HASHES
+        )
+        subchunks = riffchunk.subchunks()
+        self.assertEqual(b'A', next(subchunks).data.read(1))
+        self.assertEqual(
+            [
+                ('CNKA', {'crc32': self.crc32(b'AAA')}),
+                ('LIST', {'crc32': self.crc32(NESTED_RIFF[32:58])}),
+                ('CNKB', {
+                    'crc32': self.crc32(b'BBBB'),
+                    'md5': hashlib.md5(b'BBBB').hexdigest()
+                }),
+            ],
+            [(id, dict(digests)) for id, digests in riffchunk.digests()]
+        )
+        self.assertEqual(b'', iostream.read())
+
+    def test_hashes_eagerly_streamed_subchunks(self):
+        iostream = io.BytesIO(NESTED_RIFF)
+        riffchunk = riff.RiffChunk.streamfrom(iostream, hashes=self.HASHES)
+        with riff.IOStats() as stats:
+            digests = dict(riffchunk.digests())
+        self.assertEqual(0, stats.bytesread)
+        self.assertEqual(
+            hashlib.md5(b'BBBB').hexdigest(), digests['CNKB']['md5']
+        )
+
+    def test_no_hashes_by_default(self):
+        riffchunk = riff.RiffChunk.streamfrom(io.BytesIO(NESTED_RIFF))
+        self.assertEqual(
+            [{}, {}, {}],
+            [dict(digests) for id, digests in riffchunk.digests()]
+        )
+
+
+class Test_RiffChunk_streamfrom_non_seekable(unittest.TestCase):
+    def test_reads_subchunk_data_in_order(self):
+        iostream = NonSeekableBytesIO(NESTED_RIFF)
+        riffchunk = riff.RiffChunk.streamfrom(iostream, lazy=True)
+        subchunks = riffchunk.subchunks()
+        self.assertEqual(b'AAA', next(subchunks).data.read())
+        self.assertEqual(b'INFO', next(subchunks).data.read(4))
+        self.assertEqual(b'BBBB', next(subchunks).data.read())
+
+    def test_skips_unread_subchunk_data(self):
+        iostream = NonSeekableBytesIO(NESTED_RIFF)
+        riffchunk = riff.RiffChunk.streamfrom(iostream, lazy=True)
+        subchunks = list(riffchunk.subchunks())
+        self.assertEqual(['CNKA', 'LIST', 'CNKB'], [s.id for s in subchunks])
+        self.assertEqual(b'BBBB', subchunks[2].data.read())
+
+    def test_error_reading_skipped_subchunk_data(self):
+        iostream = NonSeekableBytesIO(NESTED_RIFF)
+        riffchunk = riff.RiffChunk.streamfrom(iostream)
+        subchunks = list(riffchunk.subchunks())
+        with self.assertRaises(io.UnsupportedOperation):
+            subchunks[0].data.read()
+
+    def test_reads_nested_subchunks(self):
+        iostream = NonSeekableBytesIO(NESTED_RIFF)
+        riffchunk = riff.RiffChunk.streamfrom(iostream, lazy=True)
+        subchunks = riffchunk.subchunks()
+        next(subchunks)
+        listchunk = next(subchunks)
+        listchunk.data.read(4)
+        inam = riff.Chunk.streamfrom(listchunk.data)
+        self.assertEqual(b'Name', inam.data.read())
+
+
 class Test_RiffChunk_subchunks(unittest.TestCase):
     def test_can_iterate_subchunks(self):
         iostream = io.BytesIO(
@@ -409,6 +2009,675 @@ class Test_RiffChunk_subchunks(unittest.TestCase):
         for subchunk in riffchunk.subchunks():
             self.assertIsInstance(subchunk, riff.Chunk)
 
+    def test_reads_subchunks_after_padded_subchunk(self):
+        iostream = io.BytesIO(
+            b'RIFF\x1c\x00\x00\x00MOCK'
+            b'CNKA\x03\x00\x00\x00AAA\x00'
+            b'CNKB\x04\x00\x00\x00BBBB'
+        )
+        for readfrom in (riff.RiffChunk.readfrom, riff.RiffChunk.streamfrom):
+            iostream.seek(0)
+            riffchunk = readfrom(iostream)
+            ids = [subchunk.id for subchunk in riffchunk.subchunks()]
+            self.assertEqual(['CNKA', 'CNKB'], ids)
+
+    def test_error_for_corrupt_subchunk_when_not_lazy(self):
+        iostream = io.BytesIO(
+            b'RIFF\x1c\x00\x00\x00MOCK'
+            b'CNKA\x04\x00\x00\x00AAAA'
+            b'C\xffKB\x04\x00\x00\x00BBBB'
+        )
+        with self.assertRaises(riff.Error) as ctx:
+            riff.RiffChunk.readfrom(iostream)
+        self.assertEqual('chunk id not ascii-decodable', str(ctx.exception))
+
+    def test_lazy_iteration_stops_at_requested_subchunk(self):
+        iostream = io.BytesIO(
+            b'RIFF\x1c\x00\x00\x00MOCK'
+            b'CNKA\x04\x00\x00\x00AAAA'
+            b'C\xffKB\x04\x00\x00\x00BBBB'
+        )
+        riffchunk = riff.RiffChunk.streamfrom(iostream, lazy=True)
+        subchunk = next(riffchunk.subchunks())
+        self.assertEqual('CNKA', subchunk.id)
+        with self.assertRaises(riff.Error):
+            list(riffchunk.subchunks())
+
+    def test_lazy_iteration_caches_subchunks(self):
+        iostream = io.BytesIO(
+            b'RIFF\x1c\x00\x00\x00MOCK'
+            b'CNKA\x04\x00\x00\x00AAAA'
+            b'CNKB\x04\x00\x00\x00BBBB'
+        )
+        riffchunk = riff.RiffChunk.streamfrom(iostream, lazy=True)
+        first = next(riffchunk.subchunks())
+        subchunks = list(riffchunk.subchunks())
+        self.assertIs(first, subchunks[0])
+        self.assertEqual(subchunks, list(riffchunk.subchunks()))
+
+    def test_returns_same_subchunks_from_buffer(self):
+        for lazy in (False, True):
+            riffchunk = riff.RiffChunk.readfrom(io.BytesIO(
+                b'RIFF\x1c\x00\x00\x00MOCK'
+                b'CNKA\x04\x00\x00\x00AAAA'
+                b'CNKB\x04\x00\x00\x00BBBB'
+            ), lazy=lazy)
+            first = next(riffchunk.subchunks())
+            self.assertEqual(b'AA', first.data.read(2))
+            self.assertIs(first, next(riffchunk.subchunks()))
+            self.assertIs(first, riffchunk.find('CNKA'))
+            self.assertEqual(2, first.data.tell())
+
+    def test_lazy_iteration_unaffected_by_reading_subchunk_data(self):
+        iostream = io.BytesIO(
+            b'RIFF\x1c\x00\x00\x00MOCK'
+            b'CNKA\x04\x00\x00\x00AAAA'
+            b'CNKB\x04\x00\x00\x00BBBB'
+        )
+        riffchunk = riff.RiffChunk.streamfrom(iostream, lazy=True)
+        subchunks = riffchunk.subchunks()
+        self.assertEqual(b'AA', next(subchunks).data.read(2))
+        self.assertEqual('CNKB', next(subchunks).id)
+
+
+class Test_WaveChunk_seekframe(unittest.TestCase):
+    def setUp(self):
+        data = struct.pack('<10h', *range(10))
+        self.wavechunk = riff.WaveChunk.readfrom(
+            io.BytesIO(wavebytes(2, 16, data))
+        )
+
+    def test_seeks_data_to_frame_offset(self):
+        self.assertEqual(3, self.wavechunk.seekframe(3))
+        self.assertEqual(12, self.wavechunk.datachunk.data.tell())
+
+    def test_seek_relative_to_current(self):
+        self.wavechunk.seekframe(1)
+        self.assertEqual(3, self.wavechunk.seekframe(2, io.SEEK_CUR))
+
+    def test_seek_relative_to_end(self):
+        self.assertEqual(4, self.wavechunk.seekframe(-1, io.SEEK_END))
+
+    def test_constrained_by_start_and_end(self):
+        self.assertEqual(0, self.wavechunk.seekframe(-1))
+        self.assertEqual(5, self.wavechunk.seekframe(6))
+
+    def test_ValueError_for_invalid_whence(self):
+        with self.assertRaises(ValueError) as ctx:
+            self.wavechunk.seekframe(0, whence=3)
+        self.assertEqual('invalid whence value', str(ctx.exception))
+
+
+class Test_WaveFormatChunk_blockalign(unittest.TestCase):
+    def test_rounds_sample_bits_up_to_bytes(self):
+        formatchunk = riff.WaveFormatChunk(2, 8000, 12)
+        self.assertEqual(4, formatchunk.blockalign)
+
+    def test_24_bit_stereo(self):
+        formatchunk = riff.WaveFormatChunk(2, 8000, 24)
+        self.assertEqual(6, formatchunk.blockalign)
+
+
+class Test_WaveFormatChunk_fromchunk(unittest.TestCase):
+    def test_reads_fields(self):
+        iostream = io.BytesIO(wavebytes(2, 16, b''))
+        riffchunk = riff.RiffChunk.readfrom(iostream)
+        formatchunk = riff.WaveFormatChunk.fromchunk(
+            next(riffchunk.subchunks())
+        )
+        self.assertEqual(2, formatchunk.channels)
+        self.assertEqual(8000, formatchunk.samplerate)
+        self.assertEqual(16, formatchunk.samplebits)
+        self.assertEqual(1, formatchunk.formattag)
+
+    def test_reads_extensible_subformat(self):
+        fmt = struct.pack(
+            '<HHIIHHHHIH14s', 0xfffe, 1, 8000, 32000, 4, 32, 22, 32, 4, 3,
+            bytes(14)
+        )
+        iostream = io.BytesIO(b'fmt \x28\x00\x00\x00' + fmt)
+        formatchunk = riff.WaveFormatChunk.fromchunk(
+            riff.Chunk.readfrom(iostream)
+        )
+        self.assertEqual(3, formatchunk.formattag)
+
+    def test_error_for_unexpected_id(self):
+        iostream = io.BytesIO(b'MOCK\x00\x00\x00\x00')
+        with self.assertRaises(riff.Error) as ctx:
+            riff.WaveFormatChunk.fromchunk(riff.Chunk.readfrom(iostream))
+        self.assertEqual("unexpected chunk id 'MOCK'", str(ctx.exception))
+
+    def test_error_when_truncated(self):
+        iostream = io.BytesIO(b'fmt \x04\x00\x00\x00\x01\x00\x02\x00')
+        with self.assertRaises(riff.Error) as ctx:
+            riff.WaveFormatChunk.fromchunk(riff.Chunk.readfrom(iostream))
+        self.assertEqual('wave format chunk truncated', str(ctx.exception))
+
+
+class Test_scan(TempFileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.paths = []
+        for index in range(5):
+            path = os.path.join(self._tempdir.name, '{}.wav'.format(index))
+            with open(path, 'wb') as iostream:
+                iostream.write(wavebytes(index + 1, 16, bytes(4)))
+            self.paths.append(path)
+
+    def test_yields_result_for_each_path(self):
+        results = list(riff.scan(self.paths, workers=2))
+        self.assertEqual(
+            sorted(self.paths), sorted(result.path for result in results)
+        )
+
+    def test_reads_headers(self):
+        result, = riff.scan(self.paths[1:2])
+        self.assertIsNone(result.error)
+        self.assertEqual('WAVE', result.format)
+        self.assertEqual(
+            [('fmt ', 16), ('data', 4)], list(result.subchunks())
+        )
+        self.assertEqual(2, result.formatchunk.channels)
+
+    def test_error_record_for_bad_file(self):
+        path = self.tempfile(b'MOCK\x04\x00\x00\x00TEST')
+        paths = [path, os.path.join(self._tempdir.name, 'missing.wav')]
+        results = list(riff.scan(paths + self.paths, workers=2))
+        self.assertEqual(7, len(results))
+        errors = [result for result in results if result.error is not None]
+        self.assertEqual(sorted(paths), sorted(r.path for r in errors))
+
+    def test_error_record_keeps_headers_read(self):
+        buffer = bytearray(wavebytes(1, 16, bytes(4)))
+        buffer[36:40] = b'd\xffta'
+        result, = riff.scan([self.tempfile(bytes(buffer))])
+        self.assertIsInstance(result.error, riff.Error)
+        self.assertEqual([('fmt ', 16)], list(result.subchunks()))
+        self.assertEqual(1, result.formatchunk.channels)
+
+    def test_error_record_for_truncated_data(self):
+        buffer = wavebytes(1, 16, bytes(4))[:-2]
+        result, = riff.scan([self.tempfile(buffer)])
+        self.assertIsInstance(result.error, riff.Error)
+        self.assertEqual('chunk data truncated', str(result.error))
+        self.assertEqual([('fmt ', 16), ('data', 4)], list(result.subchunks()))
+
+    def test_reads_rf64_headers(self):
+        result, = riff.scan([self.tempfile(RF64_WAVE)])
+        self.assertIsNone(result.error)
+        self.assertEqual(
+            [('ds64', 40), ('fmt ', 16), ('BIGC', 2), ('data', 4)],
+            list(result.subchunks())
+        )
+        self.assertEqual(1, result.formatchunk.channels)
+
+    def test_scans_with_process_pool(self):
+        results = list(riff.scan(self.paths, workers=2, processes=True))
+        channels = sorted(result.formatchunk.channels for result in results)
+        self.assertEqual([1, 2, 3, 4, 5], channels)
+
+
+@unittest.skipUnless(riff.numpy, 'numpy not installed')
+class Test_WaveChunk_stats(unittest.TestCase):
+    def setUp(self):
+        data = struct.pack(
+            '<10h', 16384, 0, -16384, 32767, 8192, -32768, 0, 0, 4096, 100
+        )
+        self.wavechunk = riff.WaveChunk.readfrom(
+            io.BytesIO(wavebytes(2, 16, data))
+        )
+
+    def test_summary_statistics(self):
+        stats = self.wavechunk.stats()
+        self.assertEqual(5, stats.frames)
+        self.assertEqual([0.5, 1.0], stats.peak.tolist())
+        self.assertAlmostEqual(0.075, stats.dcoffset[0])
+        self.assertAlmostEqual(
+            ((0.25 + 0.25 + 0.0625 + 0.015625) / 5) ** 0.5, stats.rms[0]
+        )
+        self.assertEqual([0, 2], stats.clipped.tolist())
+
+    def test_overviews_span_blocks(self):
+        stats = self.wavechunk.stats(binsizes=[2, 4], blocksize=3)
+        self.assertEqual([2, 4], stats.binsizes)
+        mins, maxs = stats.overview(2)
+        self.assertEqual([-0.5, 0.0, 0.125], mins[:, 0].tolist())
+        self.assertEqual([0.5, 0.25, 0.125], maxs[:, 0].tolist())
+        mins, maxs = stats.overview(4)
+        self.assertEqual([[-0.5, -1.0], [0.125, 100 / 32768]], mins.tolist())
+
+    def test_blocks_not_widened_for_coprime_bins(self):
+        whole = self.wavechunk.stats(binsizes=[2, 3], blocksize=5)
+        with unittest.mock.patch.object(
+                riff.WaveChunk, '_readframebytes', autospec=True,
+                side_effect=riff.WaveChunk._readframebytes) as readframebytes:
+            stats = self.wavechunk.stats(binsizes=[2, 3], blocksize=1)
+        counts = [call[0][2] for call in readframebytes.call_args_list]
+        self.assertEqual([1] * 5, counts)
+        for binsize in (2, 3):
+            self.assertEqual(
+                [extremes.tolist() for extremes in whole.overview(binsize)],
+                [extremes.tolist() for extremes in stats.overview(binsize)]
+            )
+
+    def test_workers_give_same_result(self):
+        serial = self.wavechunk.stats(binsizes=[2], blocksize=2)
+        parallel = self.wavechunk.stats(binsizes=[2], blocksize=2, workers=3)
+        self.assertEqual(serial.peak.tolist(), parallel.peak.tolist())
+        self.assertEqual(serial.rms.tolist(), parallel.rms.tolist())
+        self.assertEqual(
+            [extremes.tolist() for extremes in serial.overview(2)],
+            [extremes.tolist() for extremes in parallel.overview(2)]
+        )
+
+    def test_empty_data(self):
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(2, 16, b'')))
+        stats = wavechunk.stats(binsizes=[4])
+        self.assertEqual([0.0, 0.0], stats.rms.tolist())
+        self.assertEqual((0, 2), stats.overview(4)[0].shape)
+
+    def test_error_for_missing_overview(self):
+        with self.assertRaises(riff.Error) as ctx:
+            self.wavechunk.stats(binsizes=[2]).overview(8)
+        self.assertEqual(
+            'no overview with 8 frames per bin', str(ctx.exception)
+        )
+
+    def test_sidecar_round_trip(self):
+        stats = self.wavechunk.stats(binsizes=[2, 4])
+        sidecar = io.BytesIO()
+        size = stats.writeto(sidecar)
+        self.assertEqual(len(sidecar.getvalue()), size + 8)
+        sidecar.seek(0)
+        cached = riff.WaveStats.readfrom(sidecar)
+        self.assertEqual((5, 2), (cached.frames, cached.channels))
+        self.assertEqual(stats.peak.tolist(), cached.peak.tolist())
+        self.assertEqual(stats.rms.tolist(), cached.rms.tolist())
+        self.assertEqual(stats.clipped.tolist(), cached.clipped.tolist())
+        self.assertEqual([2, 4], cached.binsizes)
+        self.assertEqual(
+            [extremes.tolist() for extremes in stats.overview(4)],
+            [extremes.tolist() for extremes in cached.overview(4)]
+        )
+
+
+@unittest.skipUnless(riff.numpy, 'numpy not installed')
+class Test_WaveChunk_transcodeto(unittest.TestCase):
+    def transcode(self, source, formatchunk, **kwargs):
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(source))
+        output = io.BytesIO()
+        wavechunk.transcodeto(output, formatchunk, blocksize=2, **kwargs)
+        output.seek(0)
+        return riff.WaveChunk.readfrom(output)
+
+    def test_converts_16_bit_to_float32(self):
+        data = struct.pack('<4h', 16384, -32768, 0, 8192)
+        formatchunk = riff.WaveFormatChunk(
+            2, 8000, 32, riff.WaveFormatChunk.WAVE_FORMAT_IEEE_FLOAT
+        )
+        output = self.transcode(wavebytes(2, 16, data), formatchunk)
+        self.assertEqual(
+            [[0.5, -1.0], [0.0, 0.25]], output.readsamples().tolist()
+        )
+
+    def test_converts_24_bit_to_16_bit_without_dither(self):
+        data = b'\x80\x00\x01' + b'\x00\x00\x80' + b'\x7f\x00\x00'
+        formatchunk = riff.WaveFormatChunk(1, 8000, 16)
+        output = self.transcode(
+            wavebytes(1, 24, data), formatchunk, dither=False
+        )
+        self.assertEqual([[256], [-32768], [0]], output.readsamples().tolist())
+
+    def test_keeps_32_bit_precision(self):
+        data = struct.pack('<3i', 123456789, -2147483648, 2147483647)
+        formatchunk = riff.WaveFormatChunk(1, 8000, 32)
+        output = self.transcode(wavebytes(1, 32, data), formatchunk)
+        self.assertEqual(data, output.datachunk.data.read())
+
+    def test_keeps_64_bit_float_precision(self):
+        data = struct.pack('<3d', 0.1, -0.123456789012345, 1e-12)
+        formatchunk = riff.WaveFormatChunk(
+            1, 8000, 64, riff.WaveFormatChunk.WAVE_FORMAT_IEEE_FLOAT
+        )
+        source = wavebytes(
+            1, 64, data, riff.WaveFormatChunk.WAVE_FORMAT_IEEE_FLOAT
+        )
+        output = self.transcode(source, formatchunk)
+        self.assertEqual(data, output.datachunk.data.read())
+
+    def test_dither_stays_within_one_step(self):
+        data = struct.pack('<i', 0x100) * 3 * 64
+        source = wavebytes(1, 24, bytes(
+            byte for index, byte in enumerate(data) if index % 4 != 3
+        ))
+        formatchunk = riff.WaveFormatChunk(1, 8000, 16)
+        output = self.transcode(
+            source, formatchunk, rng=riff.numpy.random.default_rng(1)
+        )
+        samples = [sample for sample, in output.readsamples().tolist()]
+        self.assertEqual(64 * 3, len(samples))
+        self.assertTrue(all(0 <= sample <= 2 for sample in samples))
+
+    def test_selects_channels(self):
+        data = struct.pack('<6h', 1, 2, 3, 4, 5, 6)
+        formatchunk = riff.WaveFormatChunk(1, 8000, 16)
+        output = self.transcode(
+            wavebytes(3, 16, data), formatchunk, channels=[2]
+        )
+        self.assertEqual([[3], [6]], output.readsamples().tolist())
+
+    def test_downmixes_channels(self):
+        data = struct.pack('<4h', 100, 300, -200, 0)
+        formatchunk = riff.WaveFormatChunk(1, 8000, 16)
+        output = self.transcode(
+            wavebytes(2, 16, data), formatchunk, mix=[[0.5, 0.5]]
+        )
+        self.assertEqual([[200], [-100]], output.readsamples().tolist())
+
+    def test_error_for_sample_rate_change(self):
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(1, 16, b'')))
+        output = io.BytesIO()
+        with self.assertRaises(riff.Error) as ctx:
+            wavechunk.transcodeto(output, riff.WaveFormatChunk(1, 44100, 16))
+        self.assertEqual(
+            'sample rate conversion not supported', str(ctx.exception)
+        )
+        self.assertEqual(b'', output.getvalue())
+
+    def test_error_for_channel_mismatch(self):
+        wavechunk = riff.WaveChunk.readfrom(
+            io.BytesIO(wavebytes(2, 16, bytes(4)))
+        )
+        with self.assertRaises(riff.Error) as ctx:
+            wavechunk.transcodeto(
+                io.BytesIO(), riff.WaveFormatChunk(1, 8000, 16)
+            )
+        self.assertEqual('expected 1 channels, got 2', str(ctx.exception))
+
+    def assertWritesNothing(self, message, formatchunk, **kwargs):
+        wavechunk = riff.WaveChunk.readfrom(
+            io.BytesIO(wavebytes(2, 16, bytes(4)))
+        )
+        output = io.BytesIO()
+        with self.assertRaises(riff.Error) as ctx:
+            wavechunk.transcodeto(output, formatchunk, **kwargs)
+        self.assertEqual(message, str(ctx.exception))
+        self.assertEqual(b'', output.getvalue())
+
+    def test_no_output_for_channel_mismatch(self):
+        self.assertWritesNothing(
+            'expected 1 channels, got 2', riff.WaveFormatChunk(1, 8000, 16)
+        )
+
+    def test_no_output_for_mix_shape_mismatch(self):
+        self.assertWritesNothing(
+            'mix expects 2 input channels', riff.WaveFormatChunk(1, 8000, 16),
+            mix=[[0.5, 0.25, 0.25]]
+        )
+
+    def test_no_output_for_channel_out_of_range(self):
+        self.assertWritesNothing(
+            'channel 2 out of range', riff.WaveFormatChunk(1, 8000, 16),
+            channels=[2]
+        )
+
+    def test_no_output_for_unsupported_target_format(self):
+        self.assertWritesNothing(
+            'unsupported sample format 3/16',
+            riff.WaveFormatChunk(
+                2, 8000, 16, riff.WaveFormatChunk.WAVE_FORMAT_IEEE_FLOAT
+            )
+        )
+
+    def test_output_not_finalised_on_error(self):
+        wavechunk = riff.WaveChunk.readfrom(
+            io.BytesIO(wavebytes(1, 16, bytes(8)))
+        )
+        output = io.BytesIO()
+        with unittest.mock.patch.object(
+                riff.WaveFormatChunk, 'fromfloat',
+                side_effect=riff.Error('failed')):
+            with self.assertRaises(riff.Error):
+                wavechunk.transcodeto(
+                    output, riff.WaveFormatChunk(1, 8000, 16), blocksize=2
+                )
+        output.seek(0)
+        with self.assertRaises(riff.Error):
+            riff.WaveChunk.readfrom(output)
+
+
+class Test_WaveFormatChunk_writeto(unittest.TestCase):
+    def test_round_trips_through_fromchunk(self):
+        output = io.BytesIO()
+        riff.WaveFormatChunk(2, 44100, 24).writeto(output)
+        chunk = riff.Chunk.unpackfrom(output.getvalue())
+        formatchunk = riff.WaveFormatChunk.fromchunk(chunk)
+        self.assertEqual(
+            (2, 44100, 24, 6, 264600),
+            (formatchunk.channels, formatchunk.samplerate,
+             formatchunk.samplebits, formatchunk.blockalign,
+             formatchunk.byterate)
+        )
+
+
+class Test_WaveChunk_iterframes(unittest.TestCase):
+    def test_yields_fixed_size_blocks(self):
+        data = struct.pack('<10h', *range(10))
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(2, 16, data)))
+        blocks = list(wavechunk.iterframes(2))
+        self.assertEqual([8, 8, 4], [len(block) for block in blocks])
+        self.assertEqual(data, b''.join(blocks))
+
+    def test_yields_frame_range(self):
+        data = struct.pack('<10h', *range(10))
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(2, 16, data)))
+        blocks = list(wavechunk.iterframes(2, start=1, stop=4))
+        self.assertEqual(data[4:16], b''.join(blocks))
+
+    def test_ignores_partial_trailing_frame(self):
+        data = struct.pack('<5h', *range(5))
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(2, 16, data)))
+        self.assertEqual(data[:8], b''.join(wavechunk.iterframes(4)))
+
+    def test_streams_from_non_seekable_stream(self):
+        data = struct.pack('<10h', *range(10))
+        iostream = NonSeekableBytesIO(wavebytes(2, 16, data))
+        wavechunk = riff.WaveChunk.streamfrom(iostream)
+        self.assertEqual(data, b''.join(wavechunk.iterframes(3)))
+
+    def test_hashes_frames_from_non_seekable_stream(self):
+        data = bytes(range(256)) * 16
+        iostream = NonSeekableBytesIO(wavebytes(2, 16, data))
+        wavechunk = riff.WaveChunk.streamfrom(
+            iostream, hashes={'data': ['md5']}
+        )
+        self.assertEqual(data[64:], b''.join(wavechunk.iterframes(100, 16)))
+        with riff.IOStats() as stats:
+            digests = wavechunk.datachunk.data.digests()
+        self.assertEqual(0, stats.bytesread)
+        self.assertEqual(hashlib.md5(data).hexdigest(), digests['md5'])
+
+    def test_hashes_frames_without_second_pass(self):
+        data = bytes(range(256)) * 16
+        wavechunk = riff.WaveChunk.streamfrom(
+            io.BytesIO(wavebytes(2, 16, data)), hashes={'data': ['md5']}
+        )
+        self.assertEqual(data, b''.join(wavechunk.iterframes(100)))
+        with riff.IOStats() as stats:
+            digests = wavechunk.datachunk.data.digests()
+        self.assertEqual(0, stats.bytesread)
+        self.assertEqual(hashlib.md5(data).hexdigest(), digests['md5'])
+
+    def test_blocks_decode_to_samples(self):
+        data = struct.pack('<4h', 1, 2, 3, 4)
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(2, 16, data)))
+        block = next(wavechunk.iterframes(2))
+        samples = wavechunk.formatchunk.decode(block)
+        self.assertEqual([[1, 2], [3, 4]], samples.tolist())
+
+    def test_ValueError_for_non_positive_block_size(self):
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(1, 16, b'')))
+        with self.assertRaises(ValueError) as ctx:
+            next(wavechunk.iterframes(0))
+        self.assertEqual('block size must be positive', str(ctx.exception))
+
+
+class Test_WaveChunk_readfrom(unittest.TestCase):
+    def test_reads_format_and_data_chunks(self):
+        iostream = io.BytesIO(wavebytes(2, 16, bytes(8)))
+        wavechunk = riff.WaveChunk.readfrom(iostream)
+        self.assertEqual(2, wavechunk.formatchunk.channels)
+        self.assertEqual(8, wavechunk.datachunk.size)
+        self.assertEqual(2, wavechunk.frames)
+
+    def test_error_for_non_wave_format(self):
+        iostream = io.BytesIO(b'RIFF\x04\x00\x00\x00MOCK')
+        with self.assertRaises(riff.Error) as ctx:
+            riff.WaveChunk.readfrom(iostream)
+        self.assertEqual("'MOCK' != 'WAVE'", str(ctx.exception))
+
+    def test_error_when_no_format_chunk(self):
+        iostream = io.BytesIO(b'RIFF\x0c\x00\x00\x00WAVEdata\x00\x00\x00\x00')
+        with self.assertRaises(riff.Error) as ctx:
+            riff.WaveChunk.readfrom(iostream)
+        self.assertEqual('no wave format subchunk found', str(ctx.exception))
+
+    def test_error_when_no_data_chunk(self):
+        iostream = io.BytesIO(wavebytes(1, 16, b'')[:36])
+        iostream.getbuffer()[4:8] = struct.pack('<I', 28)
+        with self.assertRaises(riff.Error) as ctx:
+            riff.WaveChunk.readfrom(iostream)
+        self.assertEqual('no wave data subchunk found', str(ctx.exception))
+
+    def test_streams_from_non_seekable_stream(self):
+        data = struct.pack('<4h', 1, 2, 3, 4)
+        iostream = NonSeekableBytesIO(wavebytes(2, 16, data))
+        wavechunk = riff.WaveChunk.streamfrom(iostream)
+        self.assertEqual([[1, 2], [3, 4]], wavechunk.readsamples().tolist())
+
+
+class Test_WaveChunk_readframes(unittest.TestCase):
+    def test_reads_frames_from_start(self):
+        data = struct.pack('<10h', *range(10))
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(2, 16, data)))
+        self.assertEqual(data[8:16], wavechunk.readframes(2, 2))
+
+    def test_reading_past_end_only_returns_whole_frames(self):
+        data = struct.pack('<5h', *range(5))
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(2, 16, data)))
+        self.assertEqual(data[4:8], wavechunk.readframes(1, 5))
+
+    def test_moves_cursor_past_frames_read(self):
+        data = struct.pack('<10h', *range(10))
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(2, 16, data)))
+        wavechunk.readframes(1, 2)
+        self.assertEqual(3, wavechunk.tellframe())
+
+    def test_single_seek_and_read(self):
+        data = struct.pack('<10h', *range(10))
+        iostream = unittest.mock.Mock(wraps=io.BytesIO(wavebytes(2, 16, data)))
+        wavechunk = riff.WaveChunk.streamfrom(iostream)
+        iostream.reset_mock()
+        self.assertEqual(data[12:20], wavechunk.readframes(3, 2))
+        self.assertEqual(1, iostream.seek.call_count)
+        self.assertEqual(1, iostream.read.call_count)
+
+
+class Test_WaveChunk_readsamples(unittest.TestCase):
+    def test_16_bit_shape_and_values(self):
+        data = struct.pack('<6h', 1, -1, 2, -2, 3, -3)
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(2, 16, data)))
+        samples = wavechunk.readsamples()
+        self.assertEqual((3, 2), samples.shape)
+        self.assertEqual([[1, -1], [2, -2], [3, -3]], samples.tolist())
+
+    def test_8_bit_unsigned(self):
+        wavechunk = riff.WaveChunk.readfrom(
+            io.BytesIO(wavebytes(1, 8, b'\x00\x80\xff'))
+        )
+        self.assertEqual([[0], [128], [255]], wavechunk.readsamples().tolist())
+
+    def test_24_bit_sign_extended(self):
+        data = b'\x01\x00\x00' + b'\xff\xff\xff' + b'\x00\x00\x80'
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(1, 24, data)))
+        self.assertEqual(
+            [[1], [-1], [-8388608]], wavechunk.readsamples().tolist()
+        )
+
+    def test_32_bit_pcm(self):
+        data = struct.pack('<2i', 2 ** 31 - 1, -2 ** 31)
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(1, 32, data)))
+        self.assertEqual(
+            [[2 ** 31 - 1], [-2 ** 31]], wavechunk.readsamples().tolist()
+        )
+
+    def test_32_bit_float(self):
+        data = struct.pack('<2f', 0.5, -0.25)
+        wavechunk = riff.WaveChunk.readfrom(
+            io.BytesIO(wavebytes(1, 32, data, formattag=3))
+        )
+        self.assertEqual([[0.5], [-0.25]], wavechunk.readsamples().tolist())
+
+    def test_64_bit_float(self):
+        data = struct.pack('<2d', 0.5, -0.25)
+        wavechunk = riff.WaveChunk.readfrom(
+            io.BytesIO(wavebytes(1, 64, data, formattag=3))
+        )
+        self.assertEqual([[0.5], [-0.25]], wavechunk.readsamples().tolist())
+
+    def test_frame_range(self):
+        data = struct.pack('<6h', 1, -1, 2, -2, 3, -3)
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(2, 16, data)))
+        self.assertEqual([[2, -2]], wavechunk.readsamples(1, 2).tolist())
+        self.assertEqual([[3, -3]], wavechunk.readsamples(-1).tolist())
+
+    def test_frame_range_reads_only_requested_bytes(self):
+        data = struct.pack('<6h', 1, -1, 2, -2, 3, -3)
+        iostream = unittest.mock.Mock(wraps=io.BytesIO(wavebytes(2, 16, data)))
+        wavechunk = riff.WaveChunk.streamfrom(iostream)
+        iostream.reset_mock()
+        wavechunk.readsamples(2, 3)
+        iostream.readinto.assert_called_once()
+        self.assertEqual(4, len(iostream.readinto.call_args[0][0]))
+
+    def test_empty_range(self):
+        data = struct.pack('<2h', 1, -1)
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(2, 16, data)))
+        self.assertEqual([], wavechunk.readsamples(1, 1).tolist())
+
+    def test_unpacked_samples_are_view_of_buffer(self):
+        data = struct.pack('<2h', 1, -1)
+        buffer = bytearray(wavebytes(2, 16, data))
+        wavechunk = riff.WaveChunk.unpackfrom(buffer)
+        samples = wavechunk.readsamples()
+        buffer[-4:-2] = struct.pack('<h', 7)
+        self.assertEqual([[7, -1]], samples.tolist())
+
+    @unittest.skipUnless(riff.numpy, 'numpy not installed')
+    def test_returns_numpy_array(self):
+        data = struct.pack('<6h', 1, -1, 2, -2, 3, -3)
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(2, 16, data)))
+        samples = wavechunk.readsamples()
+        self.assertIsInstance(samples, riff.numpy.ndarray)
+        self.assertEqual([2, -2], samples[1].tolist())
+        self.assertEqual([-1, -2, -3], samples[:, 1].tolist())
+
+    def test_memoryview_without_numpy(self):
+        data = struct.pack('<6h', 1, -1, 2, -2, 3, -3)
+        wavechunk = riff.WaveChunk.readfrom(io.BytesIO(wavebytes(2, 16, data)))
+        with unittest.mock.patch.object(riff, 'numpy', None):
+            samples = wavechunk.readsamples()
+        self.assertIsInstance(samples, memoryview)
+        self.assertEqual([[1, -1], [2, -2], [3, -3]], samples.tolist())
+
+    def test_error_for_unsupported_format(self):
+        wavechunk = riff.WaveChunk.readfrom(
+            io.BytesIO(wavebytes(1, 16, bytes(2), formattag=3))
+        )
+        with self.assertRaises(riff.Error) as ctx:
+            wavechunk.readsamples()
+        self.assertEqual('unsupported sample format 3/16', str(ctx.exception))
+
 
 if __name__ == '__main__':
     unittest.main()